@@ -1,12 +1,9 @@
-"""The main module for datahub."""
+"""The main module for datahub.
 
-import logging
-import logging.config
-
-from .core.log_config import logging_dict_config
+Logging is configured when the API is started, see `datahub.main`, so importing the
+client does not change the logging of the application it is used in.
+"""
 
-logging.config.dictConfig(logging_dict_config)
+import logging
 
 log = logging.getLogger("api_logger")
-log.debug("Logging is configured.")
-log.info("Datahub API is running...")
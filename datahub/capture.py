@@ -0,0 +1,209 @@
+"""This module defines the capture of the ingest traffic to the API.
+
+When `CAPTURE_FILE` is set, the requests that post data or set the model signals are
+appended to it with the time they were received, so a real session can be replayed as
+a benchmark with `datahub.replay`.
+
+Each request is written as a record of a fixed size header, the method, path, query
+string and content type as JSON, and the body, compressed with zstd when that makes it
+smaller. A record is written as soon as its body has been received, so a capture is
+complete up to the last request even if the server is stopped abruptly.
+"""
+
+import os
+import struct
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import BinaryIO, NamedTuple
+
+import anyio
+import orjson
+import zstandard
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CAPTURE_FILE = os.environ.get("CAPTURE_FILE", "")
+CAPTURE_PATHS = (
+    "/opal",
+    "/opal/raw",
+    "/dsr",
+    "/dsr/batch",
+    "/set_model_signals",
+    "/model_ready",
+)
+CAPTURE_MAGIC = b"DHCAPTURE1\n"
+# The time received, whether the body is compressed and the lengths of the JSON
+# description and the body
+_RECORD_HEADER = struct.Struct("<d?II")
+
+
+class CapturedRequest(NamedTuple):
+    """A request read from a capture file."""
+
+    time: float
+    method: str
+    path: str
+    query: str
+    content_type: str
+    body: bytes
+
+
+class TrafficLog:
+    """A file that captured requests are appended to, which is safe to share."""
+
+    def __init__(self, path: str | Path, level: int = 3) -> None:
+        """Initialise the log, which is created when the first request is written.
+
+        Args:
+            path: The path to the capture file. If it exists, requests are appended.
+            level: The zstd level the bodies are compressed with
+        """
+        self.path = Path(path)
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._lock = threading.Lock()
+        self._file: BinaryIO | None = None
+
+    def write(
+        self,
+        received: float,
+        method: str,
+        path: str,
+        query: str,
+        content_type: str,
+        body: bytes,
+    ) -> None:
+        """Append a request to the log.
+
+        Args:
+            received: The time the request was received, as a Unix timestamp
+            method: The HTTP method of the request
+            path: The path of the request
+            query: The query string of the request
+            content_type: The Content-Type header of the request
+            body: The body of the request
+        """
+        description = orjson.dumps([method, path, query, content_type])
+        compressed = self._compressor.compress(body)
+        is_compressed = len(compressed) < len(body)
+        if is_compressed:
+            body = compressed
+        header = _RECORD_HEADER.pack(
+            received, is_compressed, len(description), len(body)
+        )
+
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = self.path.open("ab")
+                if self._file.tell() == 0:
+                    self._file.write(CAPTURE_MAGIC)
+            self._file.write(header + description + body)
+            self._file.flush()
+
+    def close(self) -> None:
+        """Close the capture file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_capture(path: str | Path) -> Iterator[CapturedRequest]:
+    """Read the requests from a capture file in the order they were written.
+
+    A final record cut short, e.g. by the server being stopped while writing it, is
+    ignored.
+
+    Args:
+        path: The path to the capture file
+
+    Raises:
+        ValueError if the file is not a capture file.
+
+    Yields:
+        The captured requests
+    """
+    decompressor = zstandard.ZstdDecompressor()
+    with open(path, "rb") as file:
+        if file.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not a capture file.")
+
+        while header := file.read(_RECORD_HEADER.size):
+            if len(header) < _RECORD_HEADER.size:
+                return
+            received, is_compressed, description_size, body_size = (
+                _RECORD_HEADER.unpack(header)
+            )
+            description = file.read(description_size)
+            body = file.read(body_size)
+            if len(description) < description_size or len(body) < body_size:
+                return
+            if is_compressed:
+                body = decompressor.decompress(body)
+            method, request_path, query, content_type = orjson.loads(description)
+            yield CapturedRequest(
+                received, method, request_path, query, content_type, body
+            )
+
+
+class CaptureMiddleware:
+    """ASGI middleware to capture the requests posting data or setting the signals.
+
+    The body is recorded as the app receives it, so the requests are handled in the same
+    way as without the middleware.
+    """
+
+    def __init__(self, app: ASGIApp, path: str | Path = CAPTURE_FILE) -> None:
+        """Initialise the middleware around the app.
+
+        Args:
+            app: The app
+            path: The path to the capture file
+        """
+        self.app = app
+        self.log = TrafficLog(path)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request, capturing it if it is one of the `CAPTURE_PATHS`."""
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in CAPTURE_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        received = time.time()
+        chunks: list[bytes] = []
+        captured = False
+
+        async def capture() -> None:
+            nonlocal captured
+            captured = True
+            headers = dict(scope["headers"])
+            # Compressing and writing large bodies would hold up the event loop
+            await anyio.to_thread.run_sync(
+                self.log.write,
+                received,
+                scope["method"],
+                scope["path"],
+                scope["query_string"].decode("latin-1"),
+                headers.get(b"content-type", b"").decode("latin-1"),
+                b"".join(chunks),
+            )
+
+        async def receive_and_capture() -> Message:
+            message = await receive()
+            if message["type"] == "http.request" and not captured:
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await capture()
+            return message
+
+        try:
+            await self.app(scope, receive_and_capture, send)
+        finally:
+            # Requests with only query parameters are handled without reading the body
+            if not captured:
+                await capture()
@@ -0,0 +1,515 @@
+"""Client for the Datahub API, for simulators and dashboards.
+
+The client holds a pool of connections that are reused between requests. Opal data
+can be posted in batches from a background thread, polled for the frames received
+since the last poll, and DSR data is decoded into NumPy arrays. It needs httpx, which
+is installed with the `client` extra:
+
+    with DatahubClient("http://localhost:8000") as client:
+        with client.opal_writer(flush_interval=0.5) as writer:
+            writer.write({"frame": 1, "time": 0.0, ...})
+
+        poller = client.opal_poller()
+        new_frames = poller.poll()
+"""
+
+import io
+import logging
+import threading
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from types import TracebackType
+
+import httpx
+import numpy as np
+import orjson
+import pandas as pd
+from numpy.typing import NDArray
+
+from .opal import OPAL_ARRAY_LENGTH, opal_headers
+
+log = logging.getLogger(__name__)
+
+DEFAULT_URL = "http://localhost:8000"
+# Failed requests that are worth sending again later
+RETRY_STATUS_CODES = (503, 507)
+
+DSREntry = dict[str, "NDArray[np.generic] | str"]
+
+
+def opal_row(
+    data: dict[str, int | float] | Sequence[int | float]
+) -> NDArray[np.float64]:
+    """Convert a frame of Opal data to the array format.
+
+    Args:
+        data: Either a dictionary of the frame and the values, keyed by the field names
+            of `OpalModel` as with the JSON format, or the values in the array format
+
+    Raises:
+        ValueError if the array has the wrong number of values.
+
+    Returns:
+        The values in the array format, including the three unused values
+    """
+    if isinstance(data, dict):
+        values = [data[name] for name in opal_headers.values()]
+        return np.array(
+            [data["frame"], *values[:4], 0, 0, 0, *values[4:]], dtype=np.float64
+        )
+
+    row = np.asarray(data, dtype=np.float64)
+    if row.shape != (OPAL_ARRAY_LENGTH,):
+        raise ValueError(f"Expecting {OPAL_ARRAY_LENGTH} values for each row.")
+    return row
+
+
+class DatahubClient:
+    """A client for the Datahub API with a pool of reusable connections."""
+
+    def __init__(
+        self,
+        url: str = DEFAULT_URL,
+        timeout: float | None = 30.0,
+        max_connections: int = 10,
+        http_client: httpx.Client | None = None,
+    ) -> None:
+        """Initialise the client and its connection pool.
+
+        Args:
+            url: The URL of the Datahub API
+            timeout: The number of seconds to wait for each request, or None to wait
+                indefinitely
+            max_connections: The maximum number of connections held open at once
+            http_client: An existing client to send the requests with instead, e.g. a
+                `fastapi.testclient.TestClient`. It is not closed with this client.
+        """
+        self._owns_http = http_client is None
+        self.http = http_client or httpx.Client(
+            base_url=url,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    def close(self) -> None:
+        """Close the connections held by the client."""
+        if self._owns_http:
+            self.http.close()
+
+    def __enter__(self) -> "DatahubClient":
+        """Use the client as a context manager that closes it on exit."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the client."""
+        self.close()
+
+    def _request(self, method: str, path: str, **kwargs: object) -> httpx.Response:
+        """Send a request, raising a httpx.HTTPStatusError if it was not successful."""
+        response = self.http.request(method, path, **kwargs)  # type: ignore[arg-type]
+        response.raise_for_status()
+        return response
+
+    def post_opal(self, data: dict[str, int | float] | Sequence[int | float]) -> None:
+        """Post a frame of Opal data.
+
+        Args:
+            data: The frame of Opal data, in either format accepted by `opal_row`
+        """
+        self.post_opal_rows([data])
+
+    def post_opal_rows(
+        self,
+        rows: (
+            Iterable[dict[str, int | float] | Sequence[int | float]]
+            | NDArray[np.float64]
+        ),
+    ) -> None:
+        """Post many frames of Opal data at once in the binary format.
+
+        Args:
+            rows: The frames of Opal data, either as a 2D array in the array format or
+                as frames in either format accepted by `opal_row`
+        """
+        if isinstance(rows, np.ndarray):
+            array = rows.astype("<f8", copy=False)
+        else:
+            array = np.array([opal_row(row) for row in rows], dtype="<f8")
+
+        self._request(
+            "POST",
+            "/opal/raw",
+            content=array.tobytes(),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+
+    def get_opal(
+        self,
+        start: int = 0,
+        end: int | None = None,
+        start_time: float | None = None,
+        end_time: float | None = None,
+    ) -> pd.DataFrame:
+        """Get the Opal data within a range of frames and times.
+
+        Args:
+            start: The first frame to include
+            end: The last frame to include, or None to include up to the latest frame
+            start_time: The earliest time to include, in minutes from the start of the
+                simulation, or None for no lower limit
+            end_time: The latest time to include, in minutes from the start of the
+                simulation, or None for no upper limit
+
+        Returns:
+            The Opal data indexed by frame, with the times as datetimes
+        """
+        params = {
+            "start": start,
+            "end": end,
+            "start_time": start_time,
+            "end_time": end_time,
+        }
+        response = self._request(
+            "GET",
+            "/opal",
+            params={key: value for key, value in params.items() if value is not None},
+        )
+        df = pd.DataFrame(**orjson.loads(response.content)["data"])
+        df["Time"] = pd.to_datetime(df["Time"], format="ISO8601")
+        return df
+
+    def opal_writer(
+        self, flush_interval: float = 1.0, max_rows: int = 1000
+    ) -> "OpalWriter":
+        """Start posting Opal data in batches from a background thread.
+
+        Args:
+            flush_interval: The maximum number of seconds a frame waits to be posted
+            max_rows: The number of frames that are posted as soon as they are waiting
+
+        Returns:
+            The writer, which should be closed to post the remaining frames
+        """
+        return OpalWriter(self, flush_interval, max_rows)
+
+    def opal_poller(self, start: int = 0) -> "OpalPoller":
+        """Create a poller for the Opal frames received since it last polled.
+
+        Args:
+            start: The first frame to poll for
+
+        Returns:
+            The poller
+        """
+        return OpalPoller(self, start)
+
+    def upload_dsr(self, file: str | Path | bytes, filename: str = "dsr.h5") -> None:
+        """Upload a HDF5 file of DSR data.
+
+        Args:
+            file: The path to the file or its contents
+            filename: The name to send the contents under
+        """
+        if not isinstance(file, bytes):
+            filename = Path(file).name
+            file = Path(file).read_bytes()
+        self._request("POST", "/dsr", files={"file": (filename, file)})
+
+    def get_dsr(
+        self,
+        start: int = -1,
+        end: int | None = None,
+        columns: Sequence[str] | None = None,
+        minute_start: int | None = None,
+        minute_end: int | None = None,
+        ev_ids: Sequence[int] | None = None,
+    ) -> list[DSREntry]:
+        """Get DSR entries, with the data of each field as a NumPy array.
+
+        Args:
+            start: The index of the first entry to include. Defaults to -1 for the
+                most recent entry only.
+            end: The index of the last entry to include, or None to include up to the
+                most recent entry
+            columns: The names of the fields to include, lower-case with spaces
+                replaced by underscores, or None to include all of them
+            minute_start: The first minute to include in the fields with a column for
+                each minute
+            minute_end: The last minute to include in the fields with a column for
+                each minute
+            ev_ids: The indices of the EVs to include in the fields with a row for each
+                EV, or None to include all of them
+
+        Returns:
+            The DSR entries, keyed by the names of the fields. Null values in numeric
+            fields are NaN.
+        """
+        params = {
+            "start": start,
+            "end": end,
+            "col": None if columns is None else ",".join(columns),
+            "minute_start": minute_start,
+            "minute_end": minute_end,
+            "ev_ids": None if ev_ids is None else ",".join(map(str, ev_ids)),
+        }
+        response = self._request(
+            "GET",
+            "/dsr",
+            params={key: value for key, value in params.items() if value is not None},
+        )
+        return [
+            {key: _decode_dsr_field(value) for key, value in entry.items()}
+            for entry in orjson.loads(response.content)["data"]
+        ]
+
+    def get_dsr_array(self, column: str, index: int = -1) -> NDArray[np.generic]:
+        """Get the data of a single field of a DSR entry in the binary format.
+
+        This avoids the overhead of JSON for large fields.
+
+        Args:
+            column: The name of the field, lower-case with spaces replaced by
+                underscores
+            index: The index of the entry. Defaults to -1 for the most recent entry.
+
+        Returns:
+            The data of the field
+        """
+        response = self._request(
+            "GET", "/dsr/array", params={"col": column, "index": index}
+        )
+        return np.load(io.BytesIO(response.content), allow_pickle=False)
+
+    def get_wesim(self) -> dict[str, pd.DataFrame]:
+        """Get the WESIM data.
+
+        Returns:
+            The WESIM DataFrames, keyed by their names
+        """
+        response = self._request("GET", "/wesim")
+        return {
+            name: pd.DataFrame(**data)
+            for name, data in orjson.loads(response.content)["data"].items()
+        }
+
+    def set_model_signals(self, start: bool) -> None:
+        """Set whether the model should start or stop running.
+
+        Args:
+            start: True to start the model, False to stop the model
+        """
+        self._request("POST", "/set_model_signals", params={"start": start})
+
+    def model_ready(self, ready: bool = True) -> None:
+        """Signal whether the model has reset and is ready to run.
+
+        Signalling that the model is ready resets the data held in the datahub.
+
+        Args:
+            ready: Whether the model has completed setup and is ready
+        """
+        self._request("POST", "/model_ready", params={"ready": ready})
+
+    def start_signal(
+        self, wait_from: bool | None = None, timeout: float = 30.0
+    ) -> bool:
+        """Get whether the model should start running.
+
+        Args:
+            wait_from: The value last seen, to wait until the signal changes from it,
+                or None to return straight away
+            timeout: The maximum number of seconds to wait for a change
+
+        Returns:
+            Whether the model should start
+        """
+        return self._signal("start", wait_from, timeout)
+
+    def stop_signal(self, wait_from: bool | None = None, timeout: float = 30.0) -> bool:
+        """Get whether the model should stop running.
+
+        Args:
+            wait_from: The value last seen, to wait until the signal changes from it,
+                or None to return straight away
+            timeout: The maximum number of seconds to wait for a change
+
+        Returns:
+            Whether the model should stop
+        """
+        return self._signal("stop", wait_from, timeout)
+
+    def _signal(self, name: str, wait_from: bool | None, timeout: float) -> bool:
+        """Get a model signal, waiting for it to change if a value is given."""
+        if wait_from is None:
+            response = self._request("GET", f"/{name}")
+        else:
+            response = self._request(
+                "GET",
+                f"/{name}/wait",
+                params={"current": wait_from, "timeout": timeout},
+                timeout=None if self.http.timeout.read is None else timeout + 10,
+            )
+        return bool(response.json())
+
+
+class OpalWriter:
+    """Posts frames of Opal data in batches from a background thread.
+
+    Frames are posted in the binary format once `max_rows` are waiting or
+    `flush_interval` seconds have passed, whichever is first. If a batch fails because
+    the datahub is busy or cannot be reached, its frames are kept to be posted with the
+    next batch. Other failures drop the batch. The last failure is raised by `flush`
+    and `close`.
+    """
+
+    def __init__(
+        self, client: DatahubClient, flush_interval: float = 1.0, max_rows: int = 1000
+    ) -> None:
+        """Start the background thread that posts the frames.
+
+        Args:
+            client: The client to post the frames with
+            flush_interval: The maximum number of seconds a frame waits to be posted
+            max_rows: The number of frames that are posted as soon as they are waiting
+        """
+        self.client = client
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.error: httpx.HTTPError | None = None
+        self._rows: list[NDArray[np.float64]] = []
+        self._lock = threading.Lock()
+        # Held while posting, so the batches are posted in order
+        self._send_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="opal")
+        self._thread.start()
+
+    def write(self, data: dict[str, int | float] | Sequence[int | float]) -> None:
+        """Queue a frame of Opal data to be posted.
+
+        Args:
+            data: The frame of Opal data, in either format accepted by `opal_row`
+        """
+        if self._closed.is_set():
+            raise ValueError("Cannot write to a closed writer.")
+        row = opal_row(data)
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.max_rows
+        if full:
+            self._wake.set()
+
+    def flush(self) -> None:
+        """Post the waiting frames now.
+
+        Raises:
+            The last httpx.HTTPError from posting the frames, if any.
+        """
+        self._send()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def close(self) -> None:
+        """Stop the background thread and post the remaining frames.
+
+        Raises:
+            The last httpx.HTTPError from posting the frames, if any.
+        """
+        self._closed.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+
+    def __enter__(self) -> "OpalWriter":
+        """Use the writer as a context manager that closes it on exit."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the writer."""
+        self.close()
+
+    def _run(self) -> None:
+        """Post the waiting frames at each interval, or sooner if enough are waiting."""
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._send()
+
+    def _send(self) -> None:
+        """Post the waiting frames, recording any failure."""
+        with self._send_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return
+
+            try:
+                self.client.post_opal_rows(np.stack(rows))
+            except httpx.HTTPError as err:
+                log.error(f"Failed to post {len(rows)} Opal frames: {err}")
+                self.error = err
+                if _retryable(err):
+                    with self._lock:
+                        self._rows[:0] = rows
+
+
+class OpalPoller:
+    """Polls for the Opal frames received since the last poll.
+
+    Only frames after the latest frame already polled are returned, so earlier frames
+    that are overwritten or received out of order are not.
+    """
+
+    def __init__(self, client: DatahubClient, start: int = 0) -> None:
+        """Initialise the poller.
+
+        Args:
+            client: The client to poll with
+            start: The first frame to poll for
+        """
+        self.client = client
+        self.next_frame = start
+
+    def poll(self) -> pd.DataFrame:
+        """Get the frames received since the last poll.
+
+        Returns:
+            The new Opal data indexed by frame, which may be empty
+        """
+        df = self.client.get_opal(start=self.next_frame)
+        if len(df.index):
+            self.next_frame = int(df.index[-1]) + 1
+        return df
+
+
+def _decode_dsr_field(value: object) -> "NDArray[np.generic] | str":
+    """Convert a field of a DSR entry from JSON to a NumPy array, if it is a list."""
+    if not isinstance(value, list):
+        return str(value)
+    array = np.array(value)
+    # Numeric fields containing nulls, i.e. NaN, are decoded as objects
+    if array.dtype == object:
+        array = array.astype(np.float64)
+    return array
+
+
+def _retryable(err: httpx.HTTPError) -> bool:
+    """Check whether a failed request is worth sending again later."""
+    if isinstance(err, httpx.HTTPStatusError):
+        return err.response.status_code in RETRY_STATUS_CODES
+    return isinstance(err, httpx.TransportError)
@@ -0,0 +1,301 @@
+"""This module defines the compression of the API responses."""
+
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from functools import partial
+
+import anyio
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+COMPRESSION_LEVEL = int(os.environ.get("COMPRESSION_LEVEL", "6"))
+COMPRESSION_MINIMUM_SIZE = int(os.environ.get("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_CACHE_BYTES = int(os.environ.get("COMPRESSION_CACHE_BYTES", "268435456"))
+# Bodies at least this size are compressed in a worker thread, so the event loop is
+# not held up. Smaller bodies take less time to compress than to hand over.
+COMPRESSION_THREAD_SIZE = 65536
+ENCODINGS = ("zstd", "gzip")
+# Binary arrays barely compress and are sent from files without copying, and Parquet
+# files are already compressed
+UNCOMPRESSED_MEDIA_TYPES = (
+    "application/octet-stream",
+    "application/vnd.apache.parquet",
+)
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """Choose the encoding for a response from the Accept-Encoding request header.
+
+    Args:
+        accept_encoding: The value of the Accept-Encoding header
+
+    Returns:
+        The accepted encoding with the highest quality value, preferring the order of
+        `ENCODINGS` for equal values, or None if no encoding is accepted
+    """
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip()] = quality
+
+    default = qualities.get("*", 0.0)
+    accepted = [
+        (qualities.get(encoding, default), -i, encoding)
+        for i, encoding in enumerate(ENCODINGS)
+        if qualities.get(encoding, default) > 0
+    ]
+
+    return max(accepted)[2] if accepted else None
+
+
+class Compressor:
+    """Incrementally compresses a stream of bytes with gzip or zstd.
+
+    The same level is used for both encodings, limited to a maximum of 9 for gzip.
+    """
+
+    def __init__(self, encoding: str, level: int = COMPRESSION_LEVEL) -> None:
+        """Initialise the compressor for the given encoding."""
+        if encoding == "gzip":
+            self._compressor: "zlib._Compress | zstandard.ZstdCompressionObj" = (
+                zlib.compressobj(min(level, 9), zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            )
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress the next chunk of data, returning any available output."""
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """Finish the stream, returning the remaining output."""
+        return self._compressor.flush()
+
+
+def compress(data: bytes, encoding: str, level: int = COMPRESSION_LEVEL) -> bytes:
+    """Compress all of the data with the given encoding.
+
+    Args:
+        data: The data to compress
+        encoding: The encoding to use, one of `ENCODINGS`
+        level: The compression level
+
+    Returns:
+        The compressed data
+    """
+    if encoding == "zstd":
+        # Compress in one go so the content size is written in the frame header
+        return zstandard.ZstdCompressor(level=level).compress(data)
+
+    compressor = Compressor(encoding, level)
+    return compressor.compress(data) + compressor.flush()
+
+
+class CompressionMiddleware:
+    """ASGI middleware to compress responses with the encoding accepted by the client.
+
+    Responses smaller than the minimum size, which already have a Content-Encoding or
+    which have one of the `UNCOMPRESSED_MEDIA_TYPES`, are sent unchanged. Streaming
+    responses are compressed as each chunk is sent. Bodies and chunks of at least
+    `COMPRESSION_THREAD_SIZE` are compressed in a worker thread.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        level: int = COMPRESSION_LEVEL,
+    ) -> None:
+        """Initialise the middleware around the app."""
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request, compressing the response if possible."""
+        if scope["type"] == "http":
+            headers = Headers(scope=scope)
+            encoding = negotiate_encoding(headers.get("Accept-Encoding", ""))
+            if encoding is not None:
+                responder = _CompressionResponder(
+                    self.app, encoding, self.minimum_size, self.level
+                )
+                await responder(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
+
+
+class _CompressionResponder:
+    """Compresses the messages of a single response."""
+
+    def __init__(
+        self, app: ASGIApp, encoding: str, minimum_size: int, level: int
+    ) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.level = level
+        self.compressor = Compressor(encoding, level)
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Hold the headers until the first body shows if compression is needed
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers or headers.get(
+                "content-type", ""
+            ).startswith(UNCOMPRESSED_MEDIA_TYPES)
+            return
+        if message["type"] != "http.response.body":
+            # e.g. a file sent by the server with the pathsend extension, unchanged
+            if not self.started:
+                self.started = True
+                self.passthrough = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            if self.passthrough or (len(body) < self.minimum_size and not more_body):
+                self.passthrough = True
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            del headers["Content-Length"]
+            if not more_body:
+                compress_all = partial(
+                    compress, encoding=self.encoding, level=self.level
+                )
+                body = await self._run(compress_all, body)
+                headers["Content-Length"] = str(len(body))
+                await self.send(self.initial_message)
+                await self.send({**message, "body": body})
+                return
+            await self.send(self.initial_message)
+        elif self.passthrough:
+            await self.send(message)
+            return
+
+        body = await self._run(self.compressor.compress, body)
+        if not more_body:
+            body += self.compressor.flush()
+        await self.send({**message, "body": body})
+
+    async def _run(self, compress_body: Callable[[bytes], bytes], body: bytes) -> bytes:
+        """Compress a body, in a worker thread if it is large."""
+        if len(body) < COMPRESSION_THREAD_SIZE:
+            return compress_body(body)
+        return await anyio.to_thread.run_sync(compress_body, body)
+
+
+class CompressedCache:
+    """A least recently used cache of compressed response bodies.
+
+    This is used for payloads which never change once created, so each is only
+    compressed once. The cache is limited to a total number of bytes. It is shared by
+    the routes running in threads, so it is locked while looked up or changed, but not
+    while a payload is rendered and compressed.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = COMPRESSION_CACHE_BYTES,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        level: int = COMPRESSION_LEVEL,
+    ) -> None:
+        """Initialise an empty cache."""
+        self.max_bytes = max_bytes
+        self.minimum_size = minimum_size
+        self.level = level
+        self.nbytes = 0
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[tuple[Hashable, str], bytes] = OrderedDict()
+
+    def response(
+        self,
+        key: Hashable,
+        encoding: str,
+        render: Callable[[], bytes],
+        media_type: str = "application/json",
+    ) -> Response:
+        """Get a compressed response for a payload, compressing it if not cached.
+
+        Args:
+            key: A key that uniquely identifies the payload
+            encoding: The encoding to compress the payload with
+            render: A function to create the uncompressed payload
+            media_type: The media type of the payload
+
+        Returns:
+            The response with the compressed payload, or the uncompressed payload if it
+            is smaller than the minimum size
+        """
+        with self._lock:
+            body = self._cache.get((key, encoding))
+            if body is not None:
+                self._cache.move_to_end((key, encoding))
+        if body is None:
+            content = render()
+            if len(content) < self.minimum_size:
+                return Response(content, media_type=media_type)
+            body = compress(content, encoding, self.level)
+            with self._lock:
+                self._add((key, encoding), body)
+
+        return Response(
+            body,
+            media_type=media_type,
+            headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+        )
+
+    def _add(self, key: tuple[Hashable, str], body: bytes) -> None:
+        """Add a body to the cache, evicting the least recently used if needed.
+
+        The lock must be held.
+        """
+        if len(body) > self.max_bytes or key in self._cache:
+            return
+        self._cache[key] = body
+        self.nbytes += len(body)
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self.nbytes -= len(evicted)
+
+    def clear(self) -> None:
+        """Remove all the payloads from the cache."""
+        with self._lock:
+            self._cache.clear()
+            self.nbytes = 0
+
+
+compressed_cache = CompressedCache()
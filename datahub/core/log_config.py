@@ -4,6 +4,7 @@ import os
 
 LOG_LEVEL: str = os.environ.get("API_LOG_LEVEL", "DEBUG")
 FORMAT: str = "[%(levelname)s] %(asctime)s | %(message)s"
+LOG_FILE: str = "./log/logging_file.log"
 logging_dict_config = {
     "version": 1,
     "formatters": {
@@ -32,7 +33,8 @@ logging_dict_config = {
         "file": {
             "level": LOG_LEVEL,
             "class": "logging.FileHandler",
-            "filename": "./log/logging_file.log",
+            "filename": LOG_FILE,
+            "delay": True,
             "formatter": "basic",
         },
     },
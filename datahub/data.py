@@ -1,22 +1,71 @@
 """This module defines the data structures for each of the models."""
 
+import threading
+
 import pandas as pd
 from numpy.typing import NDArray
 
+from .dsr import DSR_STORAGE_DIR, ArrayPool, SeriesStack
 from .opal import create_opal_frame
 
-opal_df: pd.DataFrame = create_opal_frame()
+# The Opal frame is created on first use, see __getattr__
+opal_df: pd.DataFrame
+# Held while appending to or resetting the Opal data, as concurrent appends would lose
+# rows
+opal_lock = threading.Lock()
 dsr_data: list[dict[str, NDArray | str]] = []  # type: ignore[type-arg]
+dsr_summaries: list[dict[str, NDArray | str | int]] = []  # type: ignore[type-arg]
+dsr_pool = ArrayPool(DSR_STORAGE_DIR)
+dsr_series: dict[str, SeriesStack] = {}
+# Held while appending to or resetting the DSR data, so the entries, summaries and
+# series match
+dsr_lock = threading.Lock()
 wesim_data: dict[str, dict] = {}  # type: ignore[type-arg]
+# Held while replacing the WESIM data, so it is read together with its generation
+wesim_lock = threading.Lock()
+wesim_generation: int = 0
+
+dsr_generation: int = 0
 
 model_running: bool = False
 model_resetting: bool = False
 
 
+_opal_lock = threading.Lock()
+
+
+def __getattr__(name: str) -> pd.DataFrame:
+    """Create the Opal frame the first time it is accessed.
+
+    This keeps building the frame out of importing the module, so the app starts faster.
+    """
+    if name != "opal_df":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _opal_lock:
+        if "opal_df" not in globals():
+            globals()["opal_df"] = create_opal_frame()
+
+    return globals()["opal_df"]
+
+
 def reset_data() -> None:
     """Reset the OPAL and DSR data to their initial (empty) values."""
     global opal_df
     global dsr_data
+    global dsr_summaries
+    global dsr_series
+    global dsr_generation
 
-    opal_df = create_opal_frame()
-    dsr_data = []
+    # The locks are held so the data is not reset part way through an append
+    with opal_lock:
+        # Only a frame whose accessor has been created (and cached) can have spilled
+        # frames
+        if "opal_df" in globals() and "opal" in vars(opal_df):
+            opal_df.opal.delete_spilled()
+        opal_df = create_opal_frame()
+    with dsr_lock:
+        dsr_data = []
+        dsr_summaries = []
+        dsr_series = {}
+        dsr_pool.clear()
+        dsr_generation += 1
@@ -1,8 +1,14 @@
 """This module defines the data structures for the MEDUSA Demand Simulator model."""
 
-from typing import BinaryIO
+import hashlib
+import itertools
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO
 
-import h5py  # type: ignore
 import numpy as np
 from fastapi import HTTPException
 from numpy.typing import NDArray
@@ -10,6 +16,9 @@ from pydantic import BaseModel, Field
 
 from . import log
 
+if TYPE_CHECKING:
+    import h5py  # type: ignore
+
 
 class DSRModel(BaseModel):
     """Define required key values for Demand Side Response data."""
@@ -41,11 +50,45 @@ class DSRModel(BaseModel):
         allow_population_by_field_name = True
 
 
+DSR_STORAGE_DIR = os.environ.get("DSR_STORAGE_DIR", "")
+DSR_THREADS = int(os.environ.get("DSR_THREADS", str(os.cpu_count() or 1)))
+
+# Threads for processing the entries of a DSR upload in parallel
+dsr_executor = ThreadPoolExecutor(DSR_THREADS, thread_name_prefix="dsr")
+
 dsr_headers = {
     field["title"]: name
     for name, field in DSRModel.schema(by_alias=False)["properties"].items()
 }
 
+# The fields with the same shape in every entry, which can be stacked across entries.
+# Activity Types is excluded as it holds characters.
+SERIES_FIELDS = tuple(
+    field.alias
+    for field in DSRModel.__fields__.values()
+    if field.annotation is not str
+    and field.field_info.extra["shape"][0] is not None
+    and field.alias != "Activity Types"
+)
+
+MINUTES_PER_DAY = 1440
+
+# The fields with a row for each EV, and those with a column for each minute
+EV_FIELDS = tuple(
+    field.alias
+    for field in DSRModel.__fields__.values()
+    if field.annotation is not str and field.field_info.extra["shape"][0] is None
+)
+MINUTE_FIELDS = tuple(
+    field.alias
+    for field in DSRModel.__fields__.values()
+    if field.annotation is not str
+    and field.field_info.extra["shape"][1] == MINUTES_PER_DAY
+)
+
+SUMMARY_CATEGORIES = ("EV State", "EV Locations")
+MAX_SUMMARY_CATEGORIES = 64
+
 
 def validate_dsr_data(data: dict[str, NDArray | str]) -> None:
     """Validate the shapes of the arrays in the DSR data.
@@ -108,12 +151,445 @@ def read_dsr_file(file: BinaryIO) -> dict[str, NDArray | str]:
     Returns:
         The dictionary representation of the DSR Data.
     """
+    # h5py is only imported when needed to keep it out of the app's startup time
+    import h5py  # type: ignore
+
     with h5py.File(file, "r") as h5file:
-        data = {
-            key: (
-                value[...] if key not in ["Name", "Warn"] else str(value.asstr()[...])
+        data = _read_dsr_group(h5file)
+
+    return data
+
+
+def read_dsr_entries(file: BinaryIO) -> list[dict[str, NDArray | str]]:
+    """Reads a HDF5 file with the DSR data of one or more entries.
+
+    The file either has the datasets of a single entry at the top level, or a group
+    for each entry containing its datasets. The groups are read in the order of their
+    names, compared as numbers if they are all integers.
+
+    Args:
+        file (BinaryIO): A binary file-like object referencing the HDF5 file
+
+    Returns:
+        The dictionary representation of the DSR Data of each entry.
+    """
+    import h5py  # type: ignore
+
+    with h5py.File(file, "r") as h5file:
+        names = list(h5file.keys())
+        if not names or not all(isinstance(h5file[name], h5py.Group) for name in names):
+            return [_read_dsr_group(h5file)]
+
+        if all(name.isdigit() for name in names):
+            names.sort(key=int)
+        entries = [_read_dsr_group(h5file[name]) for name in names]
+
+    return entries
+
+
+def _read_dsr_group(group: "h5py.Group") -> dict[str, NDArray | str]:
+    """Reads the datasets in a HDF5 group into a dictionary."""
+    return {
+        key: (
+            _read_dataset(value)
+            if key not in ["Name", "Warn"]
+            else str(value.asstr()[...])
+        )
+        for key, value in group.items()
+    }
+
+
+def _read_dataset(dataset: "h5py.Dataset") -> NDArray:
+    """Reads a HDF5 dataset into a new array.
+
+    Chunked datasets compressed with gzip, with or without shuffle, have their chunks
+    decompressed in parallel straight into the array, as decompression releases the
+    GIL. The compressed chunks are read in this thread, as h5py must not be called
+    from the decoding threads. Other datasets are read directly into the array by
+    HDF5, which handles any other filters such as lzf.
+
+    Args:
+        dataset: The dataset to read
+
+    Returns:
+        The data in the dataset
+    """
+    if dataset.dtype.kind == "O" or dataset.size == 0:
+        return dataset[...]
+
+    array = np.empty(dataset.shape, dtype=dataset.dtype)
+    filters = _chunk_filters(dataset)
+    if filters is None:
+        dataset.read_direct(array)
+        return array
+
+    chunks = dataset.chunks
+    offsets = itertools.product(
+        *(range(0, size, chunk) for size, chunk in zip(array.shape, chunks))
+    )
+    futures = []
+    for offset in offsets:
+        filter_mask, raw = dataset.id.read_direct_chunk(offset)
+        futures.append(
+            dsr_executor.submit(
+                _decode_chunk, filter_mask, raw, filters, offset, chunks, array
             )
-            for key, value in h5file.items()
+        )
+    for future in futures:
+        future.result()
+
+    return array
+
+
+def _chunk_filters(dataset: "h5py.Dataset") -> list[str] | None:
+    """Get the filters of a dataset, if its chunks can be decoded in parallel.
+
+    Returns:
+        The filters in the order they were applied, or None if the dataset has one
+        chunk, missing chunks or filters other than gzip and shuffle.
+    """
+    import h5py  # type: ignore
+
+    if dataset.chunks is None or dataset.id.get_num_chunks() < 2:
+        return None
+    if dataset.id.get_num_chunks() != np.prod(
+        [-(-size // chunk) for size, chunk in zip(dataset.shape, dataset.chunks)]
+    ):
+        return None
+
+    names = {h5py.h5z.FILTER_DEFLATE: "gzip", h5py.h5z.FILTER_SHUFFLE: "shuffle"}
+    plist = dataset.id.get_create_plist()
+    filters = [plist.get_filter(i)[0] for i in range(plist.get_nfilters())]
+    if not set(filters) <= names.keys():
+        return None
+
+    return [names[code] for code in filters]
+
+
+def _decode_chunk(
+    filter_mask: int,
+    raw: bytes,
+    filters: list[str],
+    offset: tuple[int, ...],
+    chunks: tuple[int, ...],
+    out: NDArray,
+) -> None:
+    """Decompress a chunk of a dataset into its region of the output array."""
+    # Undo the filters in reverse, skipping any that were not applied to this chunk
+    for i in reversed(range(len(filters))):
+        if filter_mask & (1 << i):
+            continue
+        if filters[i] == "gzip":
+            raw = zlib.decompress(raw)
+        else:
+            # Shuffle stores the nth byte of every value together
+            planes = np.frombuffer(raw, dtype=np.uint8).reshape(out.dtype.itemsize, -1)
+            unshuffled = np.empty(planes.shape[::-1], dtype=np.uint8)
+            for byte, plane in enumerate(planes):
+                unshuffled[:, byte] = plane
+            raw = unshuffled.data
+
+    # Chunks at the edges are stored whole, so only part of them is in the dataset
+    chunk = np.frombuffer(raw, dtype=out.dtype).reshape(chunks)
+    region = tuple(
+        slice(start, min(start + size, length))
+        for start, size, length in zip(offset, chunks, out.shape)
+    )
+    out[region] = chunk[tuple(slice(0, r.stop - r.start) for r in region)]
+
+
+def slice_dsr_array(
+    alias: str,
+    array: NDArray,
+    minutes: slice = slice(None),
+    evs: list[int] | None = None,
+) -> NDArray:
+    """Select a range of minutes and a subset of EVs from an array of DSR data.
+
+    Only the selected values are read, so if the array is memory mapped the rest of it
+    is never loaded from storage. A memory map is returned as a plain array viewing the
+    same data, as the JSON serialiser only accepts plain arrays.
+
+    Args:
+        alias: The alias of the field the array is from
+        array: The array of the field
+        minutes: The minutes to select, if the field has a column for each minute
+        evs: The indices of the EVs to select if the field has a row for each EV, or
+            None to select all of them
+
+    Returns:
+        The selected values, or the whole array if nothing is selected
+    """
+    if evs is not None and alias in EV_FIELDS:
+        array = array[evs]
+    if minutes != slice(None) and alias in MINUTE_FIELDS:
+        array = np.ascontiguousarray(array[:, minutes])
+
+    return np.asarray(array)
+
+
+def diff_dsr_entry(
+    entry: dict[str, NDArray | str | list],
+    base: dict[str, NDArray | str | list],
+) -> dict[str, NDArray | str | list | dict | None]:
+    """Find the fields of a DSR entry that differ from a base entry.
+
+    Fields that are the same as in the base are left out, and fields that are missing
+    from the entry are None. For the fields with a row for each EV, if the fleets are
+    the same size, only the changed rows are included. These are given as a dict of
+    the `ranges` of the changed rows, as pairs of the first and after-last row, and
+    the `values` of the changed rows in order.
+
+    Args:
+        entry: The DSR entry
+        base: The DSR entry to compare against
+
+    Returns:
+        The differences between the DSR entry and the base entry
+    """
+    delta: dict[str, NDArray | str | list | dict | None] = {
+        key: None for key in base if key not in entry
+    }
+    for key, value in entry.items():
+        base_value = base.get(key)
+        if value is base_value:
+            continue
+        if isinstance(value, np.ndarray) != isinstance(base_value, np.ndarray):
+            # Only one is an array, e.g. the field is missing from the base
+            delta[key] = value
+            continue
+        if not isinstance(value, np.ndarray) or not isinstance(base_value, np.ndarray):
+            if value != base_value:
+                delta[key] = value
+            continue
+        if value.shape != base_value.shape:
+            delta[key] = value
+            continue
+
+        differs = value != base_value
+        if np.issubdtype(value.dtype, np.floating):
+            differs &= ~(np.isnan(value) & np.isnan(base_value))
+        changed = differs.reshape(len(value), -1).any(axis=1)
+        if not changed.any():
+            continue
+        if key not in EV_FIELDS:
+            delta[key] = value
+            continue
+
+        edges = np.flatnonzero(np.diff(changed, prepend=False, append=False))
+        delta[key] = {
+            "ranges": edges.reshape(-1, 2),
+            "values": np.ascontiguousarray(value[changed]),
         }
 
-    return data
+    return delta
+
+
+def summarise_dsr_data(
+    data: dict[str, NDArray | str]
+) -> dict[str, NDArray | str | int]:
+    """Reduce the EV matrices in the DSR data to per-minute fleet summaries.
+
+    For each of the `SUMMARY_CATEGORIES` the distinct values are found and the number
+    of EVs with each value is counted for every minute. Fields with more than
+    `MAX_SUMMARY_CATEGORIES` distinct values are not categorical and are skipped. The
+    mean of the EV Battery across the fleet is also calculated for every minute.
+
+    Args:
+        data: The dictionary representation of the DSR Data, which has been validated.
+
+    Returns:
+        The summary of the DSR data. The keys are the field aliases with a suffix of
+        "Values" and "Counts" for the categories, and "Mean" for the EV Battery.
+    """
+    summary: dict[str, NDArray | str | int] = {
+        "Name": data.get("Name", ""),
+        "EVs": len(data["EV State"]),
+    }
+
+    for alias in SUMMARY_CATEGORIES:
+        array = data.get(alias)
+        if not isinstance(array, np.ndarray):
+            continue
+        values, inverse = np.unique(array, return_inverse=True)
+        if len(values) > MAX_SUMMARY_CATEGORIES:
+            log.warning(f"Too many distinct values in '{alias}' to summarise")
+            continue
+        minutes = array.shape[1]
+        bins = inverse.reshape(array.shape) * minutes + np.arange(minutes)
+        counts = np.bincount(bins.ravel(), minlength=len(values) * minutes)
+        summary[f"{alias} Values"] = values
+        summary[f"{alias} Counts"] = counts.reshape(len(values), minutes)
+
+    battery = data.get("EV Battery")
+    if isinstance(battery, np.ndarray) and battery.shape[0]:
+        summary["EV Battery Mean"] = battery.mean(axis=0)
+
+    return summary
+
+
+class ArrayPool:
+    """A content-addressed pool of read-only arrays.
+
+    Consecutive DSR uploads repeat many datasets byte-for-byte, so each distinct array
+    is stored once and shared between the entries that contain it. The pooled arrays
+    are made read-only, as changing one would change every entry that shares it.
+
+    If a storage directory is given, each array is written once to a `.npy` file named
+    by its hash and the pool holds a read-only memory map of the file instead. The data
+    then lives in the page cache rather than on the Python heap, and the files can be
+    sent as responses without being copied through Python.
+    """
+
+    def __init__(self, storage_dir: str | Path | None = None) -> None:
+        """Initialise an empty pool, storing the arrays in memory by default.
+
+        Args:
+            storage_dir: The directory to store the arrays in as memory-mapped files
+        """
+        self._lock = threading.Lock()
+        self._arrays: dict[bytes, NDArray] = {}  # type: ignore[type-arg]
+        self.storage_dir = Path(storage_dir) if storage_dir else None
+        if self.storage_dir is not None:
+            self.storage_dir.mkdir(parents=True, exist_ok=True)
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        """The number of distinct arrays in the pool."""
+        return len(self._arrays)
+
+    def intern(self, array: NDArray) -> NDArray:  # type: ignore[type-arg]
+        """Get the pooled copy of an array, adding it to the pool if not present.
+
+        Args:
+            array: The array to pool, which must not be changed afterwards
+
+        Returns:
+            The read-only pooled array with the same contents
+        """
+        array = np.ascontiguousarray(array)
+        digest = hashlib.blake2b(digest_size=32)
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(array.data)
+        key = digest.digest()
+
+        with self._lock:
+            pooled = self._arrays.get(key)
+            if pooled is None:
+                if self.storage_dir is not None:
+                    pooled = self._store(key.hex(), array)
+                else:
+                    array.flags.writeable = False
+                    pooled = array
+                    self.nbytes += array.nbytes
+                self._arrays[key] = pooled
+
+        return pooled
+
+    def _store(self, name: str, array: NDArray) -> NDArray:  # type: ignore[type-arg]
+        """Write an array to a file in the storage directory and memory map it."""
+        assert self.storage_dir is not None
+        path = self.storage_dir / f"{name}.npy"
+        if not path.is_file():
+            # Write to a temporary file first so a partial file is never mapped
+            temp_path = path.with_suffix(".tmp")
+            with temp_path.open("wb") as file:
+                np.save(file, array, allow_pickle=False)
+            temp_path.replace(path)
+
+        return np.load(path, mmap_mode="r", allow_pickle=False)
+
+    def clear(self) -> None:
+        """Remove all the arrays from the pool, deleting any stored files."""
+        with self._lock:
+            for array in self._arrays.values():
+                if isinstance(array, np.memmap) and array.filename:
+                    Path(array.filename).unlink(missing_ok=True)
+            self._arrays.clear()
+            self.nbytes = 0
+
+
+def deduplicate_dsr_data(
+    data: dict[str, NDArray | str], pool: ArrayPool
+) -> dict[str, NDArray | str]:
+    """Replace the arrays in the DSR data with their pooled copies.
+
+    Args:
+        data: The dictionary representation of the DSR Data
+        pool: The pool of arrays shared between DSR entries
+
+    Returns:
+        The DSR data referencing the pooled arrays
+    """
+    return {
+        key: value if isinstance(value, str) else pool.intern(value)
+        for key, value in data.items()
+    }
+
+
+class SeriesStack:
+    """An array of the values of a DSR field, stacked across the entries.
+
+    The stack grows as entries are appended, doubling its capacity when full, so each
+    append only copies the new values.
+    """
+
+    def __init__(self) -> None:
+        """Initialise an empty stack."""
+        self._array: NDArray | None = None  # type: ignore[type-arg]
+        self.length = 0
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes allocated for the stack."""
+        return 0 if self._array is None else self._array.nbytes
+
+    def append(self, values: NDArray) -> None:  # type: ignore[type-arg]
+        """Append the values of the next entry.
+
+        Args:
+            values: The values, which have the same shape as the values of the previous
+                entries
+        """
+        if self._array is None:
+            self._array = np.empty((1, *values.shape), dtype=values.dtype)
+        dtype = np.result_type(self._array.dtype, values.dtype)
+        full = self.length == len(self._array)
+        if full or dtype != self._array.dtype:
+            capacity = 2 * len(self._array) if full else len(self._array)
+            array = np.empty((capacity, *values.shape), dtype=dtype)
+            array[: self.length] = self._array[: self.length]
+            self._array = array
+        self._array[self.length] = values
+        self.length += 1
+
+    def view(self, start: int = 0, end: int | None = None) -> NDArray:  # type: ignore[type-arg]
+        """Get a read-only view of the values of a range of entries.
+
+        Args:
+            start: The index of the first entry, which can be negative
+            end: The index after the last entry, or None for up to the latest entry
+
+        Returns:
+            The values with the entries along the first axis
+        """
+        if self._array is None:
+            return np.empty((0,))
+        view = self._array[: self.length][start:end]
+        view.flags.writeable = False
+        return view
+
+
+def append_dsr_series(
+    series: dict[str, SeriesStack], data: dict[str, NDArray | str]
+) -> None:
+    """Append the values of the fixed-shape fields of a DSR entry to their stacks.
+
+    Args:
+        series: The stacks for each of the `SERIES_FIELDS`
+        data: The dictionary representation of the DSR Data, which has been validated
+    """
+    for alias in SERIES_FIELDS:
+        values = data[alias]
+        assert not isinstance(values, str)
+        series.setdefault(alias, SeriesStack()).append(values)
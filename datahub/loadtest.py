@@ -0,0 +1,308 @@
+"""Load test simulating a Gridlington session against the Datahub API.
+
+The load test posts Opal data at a fixed rate, uploads synthetic DSR data and runs
+concurrent readers of the Opal, DSR and WESIM data, then reports the throughput and
+latency of each endpoint. It needs the development dependencies and can run against the
+app in-process or a running server:
+
+    python -m datahub.loadtest --duration 30 --opal-rate 50 --readers 8
+    python -m datahub.loadtest --url http://localhost:8000
+"""
+
+import argparse
+import io
+import json
+import threading
+import time
+from collections.abc import Callable
+
+import h5py  # type: ignore
+import httpx
+import numpy as np
+
+from .dsr import DSRModel
+from .opal import OPAL_ARRAY_LENGTH, opal_headers
+
+READ_ENDPOINTS = {
+    "opal": "/opal",
+    "dsr": "/dsr",
+    "wesim": "/wesim",
+}
+
+
+class LatencyRecorder:
+    """Thread-safe record of the latency and errors of each endpoint."""
+
+    def __init__(self) -> None:
+        """Initialise an empty record."""
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def request(self, name: str, send: Callable[[], httpx.Response]) -> None:
+        """Send a request and record its latency, counting failures as errors.
+
+        Args:
+            name: The name to record the request under
+            send: A function that sends the request
+        """
+        start = time.perf_counter()
+        try:
+            success = send().is_success
+        except httpx.HTTPError:
+            success = False
+        latency = time.perf_counter() - start
+
+        with self._lock:
+            self.latencies.setdefault(name, []).append(latency)
+            self.errors[name] = self.errors.get(name, 0) + (not success)
+
+    def report(self, duration: float) -> dict[str, dict[str, float]]:
+        """Summarise the recorded requests.
+
+        Args:
+            duration: The duration of the load test in seconds
+
+        Returns:
+            The number of requests and errors, the throughput in requests per second
+            and the 50th, 95th and 99th percentile latencies in milliseconds for each
+            endpoint
+        """
+        with self._lock:
+            results = {}
+            for name, latencies in sorted(self.latencies.items()):
+                p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+                results[name] = {
+                    "requests": len(latencies),
+                    "errors": self.errors[name],
+                    "throughput": len(latencies) / duration,
+                    "p50": p50,
+                    "p95": p95,
+                    "p99": p99,
+                }
+
+        return results
+
+
+def create_dsr_file(evs: int) -> bytes:
+    """Create a HDF5 file of random DSR data.
+
+    Args:
+        evs: The number of EVs in the EV matrices
+
+    Returns:
+        The contents of the HDF5 file
+    """
+    buffer = io.BytesIO()
+    with h5py.File(buffer, "w") as h5file:
+        for field in DSRModel.__fields__.values():
+            if field.annotation is str:
+                h5file[field.alias] = "Load test"
+                continue
+            shape = field.field_info.extra["shape"]
+            if shape[0] is None:
+                shape = (evs, shape[1])
+            if field.alias == "Activity Types":
+                h5file[field.alias] = np.array([b"Activity"] * shape[1]).reshape(shape)
+            else:
+                h5file[field.alias] = np.random.rand(*shape).astype("float32")
+
+    return buffer.getvalue()
+
+
+def _post_opal(
+    client: httpx.Client,
+    recorder: LatencyRecorder,
+    stop: threading.Event,
+    rate: float,
+    raw: bool,
+) -> None:
+    """Post rows of Opal data at a fixed rate until stopped."""
+    frame = 1
+    next_time = time.perf_counter()
+    while not stop.is_set():
+        row = np.random.rand(OPAL_ARRAY_LENGTH) * 100
+        row[0] = frame
+        row[1] = frame / 6
+        if raw:
+            recorder.request(
+                "POST /opal/raw",
+                lambda: client.post(
+                    "/opal/raw",
+                    content=row.astype("<f8").tobytes(),
+                    headers={"Content-Type": "application/octet-stream"},
+                ),
+            )
+        else:
+            values = dict(zip(opal_headers.values(), np.delete(row, slice(5, 8))[1:]))
+            body = json.dumps({"frame": frame, **values})
+            recorder.request(
+                "POST /opal",
+                lambda: client.post(
+                    "/opal", content=body, headers={"Content-Type": "application/json"}
+                ),
+            )
+        frame += 1
+        next_time += 1 / rate
+        stop.wait(max(0.0, next_time - time.perf_counter()))
+
+
+def _upload_dsr(
+    client: httpx.Client,
+    recorder: LatencyRecorder,
+    stop: threading.Event,
+    uploads: int,
+    interval: float,
+    evs: int,
+) -> None:
+    """Upload DSR data at a fixed interval until the uploads are done or stopped."""
+    dsr_file = create_dsr_file(evs)
+    for _ in range(uploads):
+        if stop.is_set():
+            return
+        recorder.request(
+            "POST /dsr",
+            lambda: client.post("/dsr", files={"file": ("load_test.h5", dsr_file)}),
+        )
+        stop.wait(interval)
+
+
+def _read(
+    client: httpx.Client,
+    recorder: LatencyRecorder,
+    stop: threading.Event,
+    endpoints: list[str],
+) -> None:
+    """Request each of the endpoints in turn until stopped."""
+    while not stop.is_set():
+        for endpoint in endpoints:
+            path = READ_ENDPOINTS[endpoint]
+            recorder.request(f"GET {path}", lambda: client.get(path))
+
+
+def run_load_test(
+    client: httpx.Client,
+    duration: float = 10.0,
+    opal_rate: float = 10.0,
+    opal_raw: bool = False,
+    dsr_uploads: int = 1,
+    dsr_evs: int = 4329,
+    readers: int = 4,
+    read_endpoints: list[str] | None = None,
+) -> dict[str, dict[str, float]]:
+    """Run a load test simulating a Gridlington session.
+
+    The data held in the datahub is reset before the test starts.
+
+    Args:
+        client: The client for the Datahub API
+        duration: The duration of the test in seconds
+        opal_rate: The number of rows of Opal data to post per second
+        opal_raw: Whether to post the Opal data as binary rather than JSON
+        dsr_uploads: The number of DSR files to upload, evenly spaced over the test
+        dsr_evs: The number of EVs in each DSR file
+        readers: The number of concurrent readers
+        read_endpoints: The names of the endpoints each reader requests in turn, from
+            `READ_ENDPOINTS`. Defaults to all of them.
+
+    Returns:
+        The results for each endpoint, as given by `LatencyRecorder.report`
+    """
+    client.post("/model_ready", params={"ready": True})
+    recorder = LatencyRecorder()
+    stop = threading.Event()
+    endpoints = list(READ_ENDPOINTS) if read_endpoints is None else read_endpoints
+    interval = duration / max(dsr_uploads, 1)
+
+    threads = [
+        threading.Thread(
+            target=_post_opal, args=(client, recorder, stop, opal_rate, opal_raw)
+        ),
+        threading.Thread(
+            target=_upload_dsr,
+            args=(client, recorder, stop, dsr_uploads, interval, dsr_evs),
+        ),
+    ] + [
+        threading.Thread(target=_read, args=(client, recorder, stop, endpoints))
+        for _ in range(readers)
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    stop.wait(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return recorder.report(time.perf_counter() - start)
+
+
+def format_report(results: dict[str, dict[str, float]]) -> str:
+    """Format the results of a load test as a table.
+
+    Args:
+        results: The results for each endpoint
+
+    Returns:
+        The formatted table
+    """
+    lines = [
+        f"{'Endpoint':<16}{'Requests':>10}{'Errors':>8}{'Req/s':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    ]
+    for name, result in results.items():
+        lines.append(
+            f"{name:<16}{result['requests']:>10.0f}{result['errors']:>8.0f}"
+            f"{result['throughput']:>10.1f}{result['p50']:>10.1f}"
+            f"{result['p95']:>10.1f}{result['p99']:>10.1f}"
+        )
+
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Run the load test from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--url", help="URL of a running server. Defaults to the app in-process."
+    )
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--opal-rate", type=float, default=10.0)
+    parser.add_argument("--opal-raw", action="store_true")
+    parser.add_argument("--dsr-uploads", type=int, default=1)
+    parser.add_argument("--dsr-evs", type=int, default=4329)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument(
+        "--read-endpoints", default=",".join(READ_ENDPOINTS), help="Comma-separated"
+    )
+    args = parser.parse_args()
+
+    def run(client: httpx.Client) -> dict[str, dict[str, float]]:
+        return run_load_test(
+            client,
+            duration=args.duration,
+            opal_rate=args.opal_rate,
+            opal_raw=args.opal_raw,
+            dsr_uploads=args.dsr_uploads,
+            dsr_evs=args.dsr_evs,
+            readers=args.readers,
+            read_endpoints=args.read_endpoints.split(","),
+        )
+
+    if args.url:
+        with httpx.Client(base_url=args.url, timeout=None) as client:
+            results = run(client)
+    else:
+        from fastapi.testclient import TestClient
+
+        from .main import app
+
+        with TestClient(app, raise_server_exceptions=False) as test_client:
+            results = run(test_client)
+
+    print(format_report(results))
+
+
+if __name__ == "__main__":
+    main()
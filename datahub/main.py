@@ -1,21 +1,86 @@
 """Script for running Datahub API."""
 
+import importlib.util
+import io
+import logging.config
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
 import numpy as np
-from fastapi import FastAPI, HTTPException, UploadFile
-from fastapi.responses import ORJSONResponse
+import orjson
+from fastapi import Body, FastAPI, HTTPException, Request, UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    ORJSONResponse,
+    Response,
+    StreamingResponse,
+)
+from numpy.typing import NDArray
 
 from . import data as dt
 from . import log
-from .dsr import dsr_headers, read_dsr_file, validate_dsr_data
-from .opal import OpalArrayData, OpalModel, opal_headers
-from .wesim import get_wesim
+from .capture import CAPTURE_FILE, CaptureMiddleware
+from .compression import CompressionMiddleware, compressed_cache, negotiate_encoding
+from .core.log_config import LOG_FILE, logging_dict_config
+from .dsr import (
+    MINUTES_PER_DAY,
+    SERIES_FIELDS,
+    DSRModel,
+    append_dsr_series,
+    deduplicate_dsr_data,
+    diff_dsr_entry,
+    dsr_executor,
+    dsr_headers,
+    read_dsr_entries,
+    read_dsr_file,
+    slice_dsr_array,
+    summarise_dsr_data,
+    validate_dsr_data,
+)
+from .memory import check_memory, memory_limits, memory_usage
+from .opal import (
+    EXPORT_MEDIA_TYPES,
+    OpalArrayData,
+    OpalModel,
+    decode_opal_array,
+    opal_headers,
+)
+from .signals import MAX_WAIT_TIMEOUT, model_signals
+from .workloads import CONTROL, INGEST, QUERY
+
+Path(LOG_FILE).parent.mkdir(parents=True, exist_ok=True)
+logging.config.dictConfig(logging_dict_config)
+log.debug("Logging is configured.")
+log.info("Datahub API is running...")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Watch the WESIM data file for changes while the app is running.
+
+    The data is not loaded at startup, but when it is first requested.
+    """
+    from .wesim import wesim_watcher
+
+    wesim_watcher.start()
+    yield
+    wesim_watcher.stop()
+
 
 app = FastAPI(
     title="Gridlington DataHub",
+    lifespan=lifespan,
 )
+app.add_middleware(CompressionMiddleware)
+if CAPTURE_FILE:
+    app.add_middleware(CaptureMiddleware, path=CAPTURE_FILE)
 
 
 @app.post("/opal")
+@INGEST
 def create_opal_data(data: OpalModel | OpalArrayData) -> dict[str, str]:
     """POST method function for appending data to Opal Dataframe.
 
@@ -50,31 +115,93 @@ def create_opal_data(data: OpalModel | OpalArrayData) -> dict[str, str]:
         log.info("Dict format detected.")
         append_input = raw_data
 
+    check_memory()
+
     log.info("Appending new data...")
     log.debug(f"Original Opal DataFrame:\n\n{dt.opal_df}")
     try:
-        dt.opal_df.opal.append(append_input)
+        with dt.opal_lock:
+            dt.opal_df.opal.append(append_input)
     except AssertionError:
         message = "Error with Opal data on server. Fails validation."
         log.error(message)
         raise HTTPException(status_code=400, detail=message)
+    except ValueError as err:
+        message = str(err)
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
 
     log.debug(f"Updated Opal DataFrame:\n\n{dt.opal_df}")
 
     return {"message": "Data submitted successfully."}
 
 
+@app.post("/opal/raw")
+@INGEST
+def create_opal_data_raw(
+    data: bytes = Body(media_type="application/octet-stream"),
+) -> dict[str, str]:
+    """POST method function for appending binary data to Opal Dataframe.
+
+    It takes one or more rows of Opal data in the array format, with each value packed
+    as a little-endian float64, and updates the data held in the datahub. This avoids
+    the overhead of JSON for high-rate simulators. The body must be sent with the
+    `application/octet-stream` content type.
+
+    \f
+
+    Args:
+        data: The packed rows of Opal data
+
+    Returns:
+        A confirmation message
+    """  # noqa: D301
+    log.info("Received binary Opal data.")
+    try:
+        rows = decode_opal_array(data)
+    except ValueError as err:
+        message = str(err)
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
+
+    check_memory(rows.nbytes)
+
+    log.info(f"Appending {len(rows)} rows of new data...")
+    try:
+        with dt.opal_lock:
+            dt.opal_df.opal.extend(rows)
+    except AssertionError:
+        message = "Error with Opal data on server. Fails validation."
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
+    except ValueError as err:
+        message = str(err)
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
+
+    return {"message": "Data submitted successfully."}
+
+
 @app.get("/opal")
+@QUERY
 def get_opal_data(
-    start: int = 0, end: int | None = None
+    start: int = 0,
+    end: int | None = None,
+    start_time: float | None = None,
+    end_time: float | None = None,
 ) -> dict[str, dict]:  # type: ignore[type-arg]
     """GET method function for getting Opal Dataframe as JSON.
 
     It takes optional query parameters of:
     - `start`: Starting index for exported Dataframe
     - `end`: Last index that will be included in exported Dataframe
+    - `start_time`: Earliest time, in minutes from the start of the simulation, that
+      will be included in exported Dataframe
+    - `end_time`: Latest time, in minutes from the start of the simulation, that will
+      be included in exported Dataframe
 
-    And returns a dictionary containing the Opal Dataframe in JSON format.
+    And returns a dictionary containing the Opal Dataframe in JSON format, ordered by
+    index.
 
     This can be converted back to a DataFrame using the following:
     `pd.DataFrame(**data)`
@@ -84,32 +211,181 @@ def get_opal_data(
     Args:
         start: Starting index for exported Dataframe
         end: Last index that will be included in exported Dataframe
+        start_time: Earliest time that will be included in exported Dataframe
+        end_time: Latest time that will be included in exported Dataframe
 
     Returns:
         A Dict containing the Opal DataFrame in JSON format
     """  # noqa: D301
     log.info("Sending Opal data...")
-    log.debug(f"Query parameters:\n\nstart={start}\nend={end}\n")
+    log.debug(
+        f"Query parameters:\n\nstart={start}\nend={end}\n"
+        f"start_time={start_time}\nend_time={end_time}\n"
+    )
     if isinstance(end, int) and end < start:
         message = "End parameter cannot be less than Start parameter."
         log.error(message)
         raise HTTPException(status_code=400, detail=message)
+    if start_time is not None and end_time is not None and end_time < start_time:
+        message = "End time parameter cannot be less than Start time parameter."
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
 
     log.info("Filtering data...")
     log.debug(f"Current Opal DataFrame:\n\n{dt.opal_df}")
-    filtered_df = dt.opal_df.loc[start:end]
-    log.debug(f"Filtered Opal DataFrame:\n\n{dt.opal_df}")
+    filtered_df = dt.opal_df.opal.select(start, end, start_time, end_time)
+    log.debug(f"Filtered Opal DataFrame:\n\n{filtered_df}")
 
     data = filtered_df.to_dict(orient="split")
     return {"data": data}
 
 
+@app.get("/opal/export", response_class=StreamingResponse)
+@QUERY
+def export_opal_data(
+    format: str = "csv",
+    col: str | None = None,
+    start: int = 0,
+    end: int | None = None,
+) -> StreamingResponse:
+    """GET method function for exporting the Opal Dataframe as a file.
+
+    It takes optional query parameters of:
+    - `format`: The file format, either `csv` or `parquet`. Defaults to csv.
+    - `col`: A comma-separated list of which columns to include. These values are all
+      lower-case and spaces are replaced by underscores.
+    - `start`: Starting index for exported Dataframe
+    - `end`: Last index that will be included in exported Dataframe
+
+    And returns the Opal Dataframe as a file download, indexed by frame. The file is
+    streamed in chunks of rows, which are the row groups of a Parquet file, so large
+    runs are never held in memory as a whole.
+
+    This can be read into a DataFrame using the following:
+    `pd.read_csv(file, index_col="frame", parse_dates=["Time"])` or
+    `pd.read_parquet(file)`
+
+    \f
+
+    Args:
+        format: The file format
+        col: Column names to include, multiple values seperated by comma
+        start: Starting index for exported Dataframe
+        end: Last index that will be included in exported Dataframe
+
+    Raises:
+        HTTPException: If the parameters are invalid or Parquet is not available
+
+    Returns:
+        The streamed file
+    """  # noqa: D301
+    log.info("Exporting Opal data...")
+    log.debug(
+        f"Query parameters:\n\nformat={format}\ncol={col}\nstart={start}\nend={end}\n"
+    )
+    if isinstance(end, int) and end < start:
+        message = "End parameter cannot be less than Start parameter."
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
+    if format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        message = "Parquet export requires pyarrow to be installed."
+        log.error(message)
+        raise HTTPException(status_code=501, detail=message)
+
+    aliases = {name: alias for alias, name in opal_headers.items()}
+    columns = None
+    if isinstance(col, str):
+        columns = [aliases.get(name, name) for name in col.lower().split(",")]
+
+    try:
+        chunks = dt.opal_df.opal.export(format, columns, start, end)
+    except ValueError as err:
+        message = str(err)
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
+
+    return StreamingResponse(
+        QUERY.iterate(chunks),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="opal.{format}"'},
+    )
+
+
+@app.get("/opal/resample")
+@QUERY
+def get_opal_resampled(
+    every: str = "15min", agg: str = "mean"
+) -> dict[str, dict]:  # type: ignore[type-arg]
+    """GET method function for getting Opal data aggregated into time buckets.
+
+    It takes optional query parameters of:
+    - `every`: The width of each time bucket, e.g. `15min` or `1h`. Defaults to 15min.
+    - `agg`: The aggregation applied to each bucket, one of `mean`, `min`, `max` or
+      `last`. Defaults to mean.
+
+    And returns a dictionary containing the aggregated Opal Dataframe in JSON format,
+    indexed by the start time of each bucket. Empty buckets are not included.
+
+    This can be converted back to a DataFrame using the following:
+    `pd.DataFrame(**data)`
+
+    \f
+
+    Args:
+        every: The width of each time bucket
+        agg: The aggregation applied to each bucket
+
+    Returns:
+        A Dict containing the aggregated Opal DataFrame in JSON format
+    """  # noqa: D301
+    log.info("Sending resampled Opal data...")
+    log.debug(f"Query parameters:\n\nevery={every}\nagg={agg}\n")
+    try:
+        resampled_df = dt.opal_df.opal.resample_time(every, agg)
+    except ValueError as err:
+        message = str(err)
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
+
+    data = resampled_df.to_dict(orient="split")
+    return {"data": data}
+
+
+@app.get("/opal/stats")
+@QUERY
+def get_opal_stats() -> dict[str, dict]:  # type: ignore[type-arg]
+    """GET method function for getting running aggregates of the Opal data.
+
+    It returns a dictionary containing a DataFrame in JSON format with a row for each
+    of the count, sum, mean, min, max, last and (population) variance of each Opal
+    column. These are maintained as the data is received, so the cost of this request
+    does not depend on the length of the run. Values that are undefined without any
+    data are null.
+
+    This can be converted back to a DataFrame using the following:
+    `pd.DataFrame(**data)`
+
+    \f
+
+    Returns:
+        A Dict containing the aggregates DataFrame in JSON format
+    """  # noqa: D301
+    log.info("Sending Opal stats...")
+    stats_df = dt.opal_df.opal.stats()
+
+    data = stats_df.astype(object).where(stats_df.notna(), None).to_dict(orient="split")
+    return {"data": data}
+
+
 @app.post("/dsr")
+@INGEST
 def upload_dsr(file: UploadFile) -> dict[str, str | None]:
     """POST method for appending data to the DSR list.
 
     This takes a HDF5 file as input. This file has a flat structure, with each dataset
-    available at the top level.
+    available at the top level. The datasets may be chunked and compressed with gzip
+    (with or without shuffle) or lzf. Compressing the EV matrices with gzip and
+    shuffle is recommended, as their chunks are then decompressed in parallel.
 
     The required fields (datasets) are:
     - Amount (13 x 1)
@@ -142,28 +418,156 @@ def upload_dsr(file: UploadFile) -> dict[str, str | None]:
         file (UploadFile): A HDF5 file with the DSR data.
 
     Raises:
-        HTTPException: If the data is invalid
+        HTTPException: If the data is invalid or there is insufficient memory
 
     Returns:
         dict[str, str]: dictionary with the filename
     """  # noqa: D301
     log.info("Received DSR data.")
+    check_memory(file.size or 0)
+
     data = read_dsr_file(file.file)
+    # The decoded arrays can be much larger than the compressed upload
+    check_memory(_dsr_nbytes([data]))
 
     validate_dsr_data(data)
 
     log.info("Appending new data...")
-    log.debug(f"Current DSR data length: {len(dt.dsr_data)}")
-    dt.dsr_data.append(data)
-    log.debug(f"Updated DSR data length: {len(dt.dsr_data)}")
+    _append_dsr_entries([_prepare_dsr_entry(data)])
 
     return {"filename": file.filename}
 
 
+@app.post("/dsr/batch")
+@INGEST
+def upload_dsr_batch(files: list[UploadFile]) -> dict[str, list[str | None] | int]:
+    """POST method for appending many entries to the DSR list at once.
+
+    This takes one or more HDF5 files as input. Each file either has the datasets of a
+    single entry at the top level, as for `POST /dsr`, or a group for each entry
+    containing its datasets. The groups are read in the order of their names, compared
+    as numbers if they are all integers.
+
+    The entries are validated in parallel and appended in order of the files, and the
+    groups within them. If any entry is invalid, none of the entries are appended.
+
+    \f
+
+    Args:
+        files (list[UploadFile]): HDF5 files with the DSR data.
+
+    Raises:
+        HTTPException: If any of the data is invalid or there is insufficient memory
+
+    Returns:
+        dict[str, list[str] | int]: dictionary with the filenames and the number of
+            entries appended
+    """  # noqa: D301
+    log.info(f"Received {len(files)} DSR files.")
+    check_memory(sum(file.size or 0 for file in files))
+
+    filenames = []
+    entries = []
+    for file in files:
+        file_entries = read_dsr_entries(file.file)
+        filenames += [file.filename] * len(file_entries)
+        entries += file_entries
+    # The decoded arrays can be much larger than the compressed uploads
+    check_memory(_dsr_nbytes(entries))
+
+    # Validate every entry before any are added to the pool of arrays
+    list(dsr_executor.map(_validate_dsr_entry, filenames, entries))
+    prepared = list(dsr_executor.map(_prepare_dsr_entry, entries))
+
+    log.info(f"Appending {len(prepared)} new entries...")
+    _append_dsr_entries(prepared)
+
+    return {"filenames": [file.filename for file in files], "entries": len(prepared)}
+
+
+def _dsr_nbytes(entries: list[dict[str, NDArray | str]]) -> int:  # type: ignore[type-arg]
+    """Count the bytes of the arrays of DSR entries, before they are deduplicated.
+
+    Args:
+        entries: The DSR entries
+
+    Returns:
+        The total number of bytes of the arrays
+    """
+    return sum(
+        value.nbytes
+        for entry in entries
+        for value in entry.values()
+        if isinstance(value, np.ndarray)
+    )
+
+
+def _validate_dsr_entry(
+    filename: str | None,
+    data: dict[str, NDArray | str],  # type: ignore[type-arg]
+) -> None:
+    """Validate a DSR entry, naming the file it is from in any error.
+
+    Args:
+        filename: The name of the file with the entry
+        data: The DSR entry
+
+    Raises:
+        A HTTPException if the entry is invalid.
+    """
+    try:
+        validate_dsr_data(data)
+    except HTTPException as err:
+        raise HTTPException(
+            status_code=err.status_code, detail=f"{filename}: {err.detail}"
+        )
+
+
+def _prepare_dsr_entry(
+    data: dict[str, NDArray | str],  # type: ignore[type-arg]
+) -> tuple[dict[str, NDArray | str], dict[str, NDArray | str | int]]:  # type: ignore[type-arg]
+    """Deduplicate the arrays of a validated DSR entry and summarise it.
+
+    Args:
+        data: The DSR entry, which has been validated
+
+    Returns:
+        The DSR entry referencing the pooled arrays, and its summary
+    """
+    data = deduplicate_dsr_data(data, dt.dsr_pool)
+    return data, summarise_dsr_data(data)
+
+
+def _append_dsr_entries(
+    entries: list[tuple[dict[str, NDArray | str], dict[str, NDArray | str | int]]],  # type: ignore[type-arg]
+) -> None:
+    """Append DSR entries and their summaries to the DSR data together.
+
+    Args:
+        entries: The prepared DSR entries and their summaries, in order
+    """
+    log.debug(f"Current DSR data length: {len(dt.dsr_data)}")
+    with dt.dsr_lock:
+        for data, summary in entries:
+            dt.dsr_data.append(data)
+            dt.dsr_summaries.append(summary)
+            append_dsr_series(dt.dsr_series, data)
+    log.debug(f"Updated DSR data length: {len(dt.dsr_data)}")
+
+
 @app.get("/dsr", response_class=ORJSONResponse)
+@QUERY
 def get_dsr_data(
-    start: int = -1, end: int | None = None, col: str | None = None
-) -> ORJSONResponse:
+    request: Request,
+    start: int = -1,
+    end: int | None = None,
+    col: str | None = None,
+    minute_start: int | None = None,
+    minute_end: int | None = None,
+    ev_ids: str | None = None,
+    base: int | None = None,
+    stream: bool = False,
+) -> Response:
     """GET method function for getting DSR data as JSON.
 
     It takes optional query parameters of:
@@ -172,34 +576,77 @@ def get_dsr_data(
     - `end`: Last index that will be included in exported list.
     - `col`: A comma-separated list of which columns/keys within the data to get.
       These values are all lower-case and spaces are replaced by underscores.
+    - `minute_start`: First minute that will be included in the fields with a column
+      for each minute, from 0 to 1439.
+    - `minute_end`: Last minute that will be included in the fields with a column for
+      each minute, from 0 to 1439.
+    - `ev_ids`: A comma-separated list of the indices of the EVs that will be included
+      in the fields with a row for each EV.
+    - `base`: The index of an entry the client already has. If given, each entry only
+      contains the fields that differ from the base entry, see below.
+    - `stream`: Whether to stream the response one field at a time, so the whole
+      response is never held in memory. Recommended when requesting many entries.
 
     And returns a dictionary containing the DSR data in JSON format.
 
     This can be converted back to a DataFrame using the following:
     `pd.DataFrame(**data)`
 
+    With a `base`, fields that are the same as in the base entry are left out and
+    fields missing from the entry are null. For the fields with a row for each EV, if
+    the fleets are the same size, only the changed rows are sent as an object with
+    `ranges`, a list of the first and after-last index of each run of changed rows,
+    and `values`, the changed rows in order. The same `col`, `minute_start`,
+    `minute_end` and `ev_ids` apply to the base entry. Like the other responses, the
+    differences are only cached when the response is compressed, so clients sending
+    many requests with a `base` should send an `Accept-Encoding` header.
+
     \f
 
     Args:
+        request: The request, used to negotiate the response compression
         start: Starting index for exported list
         end: Last index that will be included in exported list
         col: Column names to filter by, multiple values seperated by comma
+        minute_start: First minute that will be included
+        minute_end: Last minute that will be included
+        ev_ids: Indices of the EVs to include, multiple values seperated by comma
+        base: Index of the entry to send the differences from
+        stream: Whether to stream the response one field at a time
 
     Returns:
         A Dict containing the DSR list
     """  # noqa: D301
     log.info("Sending DSR data...")
-    log.debug(f"Query parameters:\n\nstart={start}\nend={end}\ncol={col}\n")
+    log.debug(
+        f"Query parameters:\n\nstart={start}\nend={end}\ncol={col}\n"
+        f"minute_start={minute_start}\nminute_end={minute_end}\nev_ids={ev_ids}\n"
+    )
     if isinstance(end, int) and end < start:
         message = "End parameter cannot be less than Start parameter."
         log.error(message)
         raise HTTPException(status_code=400, detail=message)
+    if any(
+        minute is not None and not 0 <= minute < MINUTES_PER_DAY
+        for minute in (minute_start, minute_end)
+    ):
+        message = f"Minutes must be between 0 and {MINUTES_PER_DAY - 1}."
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
+    if (
+        minute_start is not None
+        and minute_end is not None
+        and minute_end < minute_start
+    ):
+        message = "Minute end parameter cannot be less than Minute start parameter."
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
+    minutes = slice(minute_start, None if minute_end is None else minute_end + 1)
 
     log.info("Filtering data by index...")
     log.debug(f"Current DSR data length:\n\n{len(dt.dsr_data)}")
-    data = dt.dsr_data.copy()
-    filtered_index_data = data[start : end + 1 if end else end]
-    log.debug(f"Filtered DSR data length:\n\n{len(dt.dsr_data)}")
+    indices = range(len(dt.dsr_data))[start : _slice_stop(end)]
+    log.debug(f"Filtered DSR data length:\n\n{len(indices)}")
 
     if isinstance(col, str):
         log.debug(f"Columns:\n\n{col.split(',')}\n")
@@ -213,26 +660,328 @@ def get_dsr_data(
     else:
         columns = list(dsr_headers.values())
 
-    log.info("Filtering data by column...")
-    filtered_data = []
-    for frame in filtered_index_data:
-        filtered_keys = {}
-        for key, value in frame.items():
-            if dsr_headers[key.title()] not in columns:
-                continue
-            elif not isinstance(value, str) and np.issubdtype(
-                value.dtype, np.character
-            ):
-                filtered_keys[key] = value.astype(str).tolist()
-            else:
-                filtered_keys[key] = value
-        filtered_data.append(filtered_keys)
-
-    return ORJSONResponse({"data": filtered_data})
-
-
-@app.get("/wesim")
-def get_wesim_data() -> dict[str, dict[str, dict]]:  # type: ignore[type-arg]
+    evs = None
+    if isinstance(ev_ids, str):
+        try:
+            evs = [int(ev_id) for ev_id in ev_ids.split(",")]
+        except ValueError:
+            message = "EV IDs must be comma-separated integers."
+            log.error(message)
+            raise HTTPException(status_code=400, detail=message)
+        fleet_sizes = [len(dt.dsr_data[index]["EV State"]) for index in indices]
+        if any(not -size <= ev < size for size in fleet_sizes for ev in evs):
+            message = "One or more of the EV IDs are out of range."
+            log.error(message)
+            raise HTTPException(status_code=400, detail=message)
+
+    base_entry = None
+    if base is not None:
+        if not -len(dt.dsr_data) <= base < len(dt.dsr_data):
+            message = "Base index is out of range."
+            log.error(message)
+            raise HTTPException(status_code=400, detail=message)
+        base = base % len(dt.dsr_data)
+        base_entry = dt.dsr_data[base]
+
+    if stream:
+        entries = [dt.dsr_data[index] for index in indices]
+        return StreamingResponse(
+            QUERY.iterate(_stream_dsr_data(entries, columns, minutes, evs, base_entry)),
+            media_type="application/json",
+        )
+
+    def render() -> bytes:
+        log.info("Filtering data by column...")
+        filtered_data = [
+            _render_dsr_entry(dt.dsr_data[index], columns, minutes, evs, base_entry)
+            for index in indices
+        ]
+        return ORJSONResponse({"data": filtered_data}).body
+
+    # DSR entries never change once uploaded, so each response is compressed once
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding is not None:
+        key = (
+            "dsr",
+            dt.dsr_generation,
+            indices.start,
+            indices.stop,
+            tuple(columns),
+            minutes.start,
+            minutes.stop,
+            None if evs is None else tuple(evs),
+            base,
+        )
+        return compressed_cache.response(key, encoding, render)
+
+    return Response(render(), media_type="application/json")
+
+
+def _stream_dsr_data(
+    entries: list[dict[str, NDArray | str]],  # type: ignore[type-arg]
+    columns: list[str],
+    minutes: slice = slice(None),
+    evs: list[int] | None = None,
+    base: dict[str, NDArray | str] | None = None,  # type: ignore[type-arg]
+) -> Iterator[bytes]:
+    """Serialise DSR entries to JSON one field at a time.
+
+    Args:
+        entries: The DSR entries
+        columns: The names of the columns to include
+        minutes: The minutes to include
+        evs: The indices of the EVs to include, or None to include all of them
+        base: The entry to only include the differences from, or None
+
+    Yields:
+        The chunks of the JSON response
+    """
+    log.info("Streaming data filtered by column...")
+    yield b'{"data":['
+    for i, entry in enumerate(entries):
+        yield b",{" if i else b"{"
+        filtered = _render_dsr_entry(entry, columns, minutes, evs, base)
+        for j, (key, value) in enumerate(filtered.items()):
+            yield (b"," if j else b"") + orjson.dumps(key) + b":"
+            yield orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+        yield b"}"
+    yield b"]}"
+
+
+def _render_dsr_entry(
+    entry: dict[str, NDArray | str],  # type: ignore[type-arg]
+    columns: list[str],
+    minutes: slice = slice(None),
+    evs: list[int] | None = None,
+    base: dict[str, NDArray | str] | None = None,  # type: ignore[type-arg]
+) -> dict[str, NDArray | str | list | dict | None]:  # type: ignore[type-arg]
+    """Filter a DSR entry, only including the differences from a base entry if given.
+
+    Args:
+        entry: The DSR entry
+        columns: The names of the columns to include
+        minutes: The minutes to include
+        evs: The indices of the EVs to include, or None to include all of them
+        base: The entry to only include the differences from, or None
+
+    Returns:
+        The filtered DSR entry, or its differences from the filtered base entry
+    """
+    filtered = _filter_dsr_columns(entry, columns, minutes, evs)
+    if base is None:
+        return dict(filtered)
+
+    return diff_dsr_entry(filtered, _filter_dsr_columns(base, columns, minutes, evs))
+
+
+def _filter_dsr_columns(
+    entry: dict[str, NDArray | str],  # type: ignore[type-arg]
+    columns: list[str],
+    minutes: slice = slice(None),
+    evs: list[int] | None = None,
+) -> dict[str, NDArray | str | list]:  # type: ignore[type-arg]
+    """Select the columns from a DSR entry, converting character arrays to lists.
+
+    Args:
+        entry: The DSR entry
+        columns: The names of the columns to include
+        minutes: The minutes to include
+        evs: The indices of the EVs to include, or None to include all of them
+
+    Returns:
+        The filtered DSR entry
+    """
+    filtered_keys: dict[str, NDArray | str | list] = {}  # type: ignore[type-arg]
+    for key, value in entry.items():
+        if dsr_headers[key.title()] not in columns:
+            continue
+        elif isinstance(value, str):
+            filtered_keys[key] = value
+        elif np.issubdtype(value.dtype, np.character):
+            filtered_keys[key] = value.astype(str).tolist()
+        else:
+            filtered_keys[key] = slice_dsr_array(key, value, minutes, evs)
+
+    return filtered_keys
+
+
+@app.get("/dsr/series", response_class=ORJSONResponse)
+@QUERY
+def get_dsr_series(col: str, start: int = 0, end: int | None = None) -> ORJSONResponse:
+    """GET method function for getting DSR fields across the entries as JSON.
+
+    This is available for the fields with the same shape in every entry: Amount,
+    Cost, kWh Cost, Activities, Activities Outside Home, EV DT, Baseline EV,
+    Baseline Non-EV, Actual EV and Actual Non-EV. The values of each field are kept
+    stacked across the entries as they are uploaded.
+
+    It takes query parameters of:
+    - `col`: A comma-separated list of which columns/keys within the data to get.
+      These values are all lower-case and spaces are replaced by underscores.
+    - `start`: Starting index of the entries. Defaults to 0 for the first entry.
+    - `end`: Last index of the entries that will be included.
+
+    And returns a dictionary containing the values of each field in JSON format, with
+    an extra leading dimension for the entries. For example, `actual_ev` has a shape
+    of (entries, 1, 1440).
+
+    \f
+
+    Args:
+        col: Column names to get, multiple values seperated by comma
+        start: Starting index of the entries
+        end: Last index of the entries that will be included
+
+    Raises:
+        HTTPException: If the parameters are invalid
+
+    Returns:
+        A Dict containing the stacked values of each field
+    """  # noqa: D301
+    log.info("Sending DSR series...")
+    log.debug(f"Query parameters:\n\ncol={col}\nstart={start}\nend={end}\n")
+    if isinstance(end, int) and end < start:
+        message = "End parameter cannot be less than Start parameter."
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
+
+    aliases = []
+    for name in col.lower().split(","):
+        field = DSRModel.__fields__.get(name)
+        if field is None or field.alias not in SERIES_FIELDS:
+            message = "One or more of the specified columns are not series."
+            log.error(message)
+            raise HTTPException(status_code=400, detail=message)
+        aliases.append(field.alias)
+
+    series = {
+        alias: (
+            dt.dsr_series[alias].view(start, _slice_stop(end))
+            if alias in dt.dsr_series
+            else np.empty((0,))
+        )
+        for alias in aliases
+    }
+
+    return ORJSONResponse({"data": series})
+
+
+@app.get("/dsr/array", response_class=Response)
+@QUERY
+def get_dsr_array(col: str, index: int = -1) -> Response:
+    """GET method function for getting a single DSR array in binary.
+
+    It takes query parameters of:
+    - `col`: The column/key within the data to get. This value is lower-case and
+      spaces are replaced by underscores.
+    - `index`: The index of the entry in the DSR list. Defaults to -1 for the most
+      recent entry.
+
+    And returns the array as a `.npy` file, which is not compressed. This can be
+    converted back to an array using the following:
+    `np.load(io.BytesIO(response.content))`
+
+    If the DSR arrays are stored in files, the file is sent directly without copying
+    the array in memory.
+
+    \f
+
+    Args:
+        col: Column name of the array
+        index: Index of the entry in the DSR list
+
+    Raises:
+        HTTPException: If the column is not an array or the index is out of range
+
+    Returns:
+        The response with the array in the `.npy` format
+    """  # noqa: D301
+    log.info("Sending DSR array...")
+    log.debug(f"Query parameters:\n\ncol={col}\nindex={index}\n")
+    field = DSRModel.__fields__.get(col.lower())
+    if field is None or field.annotation is str:
+        message = "The specified column is not an array."
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
+
+    try:
+        array = dt.dsr_data[index].get(field.alias)
+    except IndexError:
+        message = "Index is out of range."
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
+    if not isinstance(array, np.ndarray):
+        message = "The specified column is not in the entry."
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
+
+    if isinstance(array, np.memmap) and array.filename:
+        return FileResponse(array.filename, media_type="application/octet-stream")
+
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return Response(buffer.getvalue(), media_type="application/octet-stream")
+
+
+@app.get("/dsr/summary", response_class=ORJSONResponse)
+@QUERY
+def get_dsr_summary(start: int = -1, end: int | None = None) -> ORJSONResponse:
+    """GET method function for getting per-minute summaries of the DSR data as JSON.
+
+    The summaries are calculated when each entry is uploaded. For every minute they
+    give the number of EVs with each of the distinct `EV State` and `EV Locations`
+    values and the mean `EV Battery` across the fleet.
+
+    It takes optional query parameters of:
+    - `start`: Starting index for exported list. Defaults to -1 for the most recent
+      entry only.
+    - `end`: Last index that will be included in exported list.
+
+    And returns a dictionary containing a list of the summaries in JSON format. Each
+    summary has the keys:
+    - Name: The name of the entry
+    - EVs: The number of EVs in the fleet
+    - EV State Values, EV Locations Values: The distinct values of the field
+    - EV State Counts, EV Locations Counts: The number of EVs with each of the
+      distinct values for every minute
+    - EV Battery Mean: The mean of the EV Battery for every minute
+
+    \f
+
+    Args:
+        start: Starting index for exported list
+        end: Last index that will be included in exported list
+
+    Returns:
+        A Dict containing the list of DSR summaries
+    """  # noqa: D301
+    log.info("Sending DSR summary...")
+    log.debug(f"Query parameters:\n\nstart={start}\nend={end}\n")
+    if isinstance(end, int) and end < start:
+        message = "End parameter cannot be less than Start parameter."
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
+
+    summaries = dt.dsr_summaries[start : _slice_stop(end)]
+
+    return ORJSONResponse({"data": summaries})
+
+
+def _slice_stop(end: int | None) -> int | None:
+    """Get the stop of a slice that includes the given last index.
+
+    Args:
+        end: The last index to include, which may be negative, or None for no limit
+
+    Returns:
+        The index to stop the slice at, or None to slice to the end
+    """
+    return None if end is None or end == -1 else end + 1
+
+
+@app.get("/wesim", response_model=None)
+@QUERY
+def get_wesim_data(request: Request) -> Response:
     """GET method function for getting Wesim data as JSON.
 
     It returns a dictionary with the WESIM data in JSON format containing the following
@@ -242,20 +991,66 @@ def get_wesim_data() -> dict[str, dict[str, dict]]:  # type: ignore[type-arg]
     - Interconnector Capacity (4, 2)
     - Interconnectors (25, 3)
 
+    The data is reloaded in the background when the WESIM data file changes.
+
     \f
 
+    Args:
+        request: The request, used to negotiate the response compression
+
     Returns:
         A Dict containing the Wesim Dataframes
     """  # noqa: D301
     log.info("Sending Wesim data...")
     if dt.wesim_data == {}:
         log.debug("Wesim data empty! Creating Wesim data...")
-        dt.wesim_data = get_wesim()
+        # The file is only read when the data is first needed, not at startup. The
+        # watcher started with the app reloads it from then on when the file changes.
+        from .wesim import wesim_watcher
+
+        wesim_watcher.load()
+
+    with dt.wesim_lock:
+        wesim_data, generation = dt.wesim_data, dt.wesim_generation
+
+    def render() -> bytes:
+        return JSONResponse(jsonable_encoder({"data": wesim_data})).body
+
+    # Each version of the WESIM data is only compressed once
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding is not None:
+        return compressed_cache.response(("wesim", generation), encoding, render)
+
+    return Response(render(), media_type="application/json")
+
+
+@app.get("/memory")
+@CONTROL
+def get_memory_usage() -> dict[str, dict[str, int]]:
+    """GET method function for getting the memory used by the data in the datahub.
 
-    return {"data": dt.wesim_data}
+    It returns a dictionary with the number of bytes used by each of the datasets and
+    their total, and the soft and hard memory limits. A limit of 0 is disabled.
+
+    Past the soft limit, memory is freed when new data is received by dropping caches.
+    Past the hard limit, new data is rejected with a 507 status code and a Retry-After
+    header.
+
+    \f
+
+    Returns:
+        A Dict containing the memory usage and limits in bytes
+    """  # noqa: D301
+    log.info("Sending memory usage...")
+
+    return {
+        "usage": memory_usage(),
+        "limits": memory_limits(),
+    }
 
 
 @app.post("/set_model_signals")
+@CONTROL
 def set_model_signals(start: bool) -> str:
     """POST method function for setting start and stop model signals.
 
@@ -274,11 +1069,13 @@ def set_model_signals(start: bool) -> str:
     message = "Start signal received" if start else "Stop signal received"
     log.info(message)
     dt.model_running = start
+    model_signals.notify()
 
     return message
 
 
 @app.post("/model_ready")
+@CONTROL
 def signal_model_ready(ready: bool) -> str:
     """POST method function for indicating when the model has reset and is ready to run.
 
@@ -302,11 +1099,13 @@ def signal_model_ready(ready: bool) -> str:
 
     if ready:
         dt.reset_data()
+    model_signals.notify()
 
     return message
 
 
 @app.get("/start")
+@CONTROL
 def get_start_signal() -> bool:
     """GET method function for getting start model signal.
 
@@ -319,10 +1118,11 @@ def get_start_signal() -> bool:
     """  # noqa: D301
     log.info("Start signal requested")
 
-    return dt.model_running and not dt.model_resetting
+    return _start_signal()
 
 
 @app.get("/stop")
+@CONTROL
 def get_stop_signal() -> bool:
     """GET method function for getting stop model signal.
 
@@ -335,4 +1135,80 @@ def get_stop_signal() -> bool:
     """  # noqa: D301
     log.info("Start signal requested")
 
+    return _stop_signal()
+
+
+@app.get("/start/wait")
+async def wait_start_signal(current: bool = False, timeout: float = 30.0) -> bool:
+    """GET method function for waiting for the start model signal to change.
+
+    It takes optional query parameters of:
+    - `current`: The value of the start signal last seen by the caller.
+    - `timeout`: The maximum number of seconds to wait for a change. Defaults to 30.
+
+    It returns as soon as the start signal differs from `current`, or when the
+    timeout expires, and gives the value of the start signal at that time.
+
+    \f
+
+    Args:
+        current: The value of the start signal last seen by the caller
+        timeout: The maximum number of seconds to wait for a change
+
+    Returns:
+        A bool flag for if the model should start
+    """  # noqa: D301
+    log.debug("Waiting for start signal...")
+    _validate_timeout(timeout)
+    await model_signals.wait_for(lambda: _start_signal() != current, timeout)
+
+    return _start_signal()
+
+
+@app.get("/stop/wait")
+async def wait_stop_signal(current: bool = True, timeout: float = 30.0) -> bool:
+    """GET method function for waiting for the stop model signal to change.
+
+    It takes optional query parameters of:
+    - `current`: The value of the stop signal last seen by the caller.
+    - `timeout`: The maximum number of seconds to wait for a change. Defaults to 30.
+
+    It returns as soon as the stop signal differs from `current`, or when the
+    timeout expires, and gives the value of the stop signal at that time.
+
+    \f
+
+    Args:
+        current: The value of the stop signal last seen by the caller
+        timeout: The maximum number of seconds to wait for a change
+
+    Returns:
+        A bool flag for if the model should stop
+    """  # noqa: D301
+    log.debug("Waiting for stop signal...")
+    _validate_timeout(timeout)
+    await model_signals.wait_for(lambda: _stop_signal() != current, timeout)
+
+    return _stop_signal()
+
+
+def _start_signal() -> bool:
+    """Whether the model should start running."""
+    return dt.model_running and not dt.model_resetting
+
+
+def _stop_signal() -> bool:
+    """Whether the model should stop running."""
     return not dt.model_running
+
+
+def _validate_timeout(timeout: float) -> None:
+    """Check the timeout for a wait request is within the allowed range.
+
+    Raises:
+        A HTTPException if the timeout is negative or too long.
+    """
+    if not 0 <= timeout <= MAX_WAIT_TIMEOUT:
+        message = f"Timeout must be between 0 and {MAX_WAIT_TIMEOUT:g} seconds."
+        log.error(message)
+        raise HTTPException(status_code=400, detail=message)
@@ -0,0 +1,110 @@
+"""This module defines the accounting of the memory used by the datahub's data."""
+
+import os
+import sys
+
+import numpy as np
+from fastapi import HTTPException
+
+from . import data as dt
+from . import log
+from .compression import compressed_cache
+
+MEMORY_SOFT_LIMIT = int(os.environ.get("MEMORY_SOFT_LIMIT", "0"))
+MEMORY_HARD_LIMIT = int(os.environ.get("MEMORY_HARD_LIMIT", "0"))
+MEMORY_RETRY_AFTER = int(os.environ.get("MEMORY_RETRY_AFTER", "30"))
+
+
+def _sizeof(value: object, seen: set[int] | None = None) -> int:
+    """Estimate the number of bytes used by a value and its contents.
+
+    Args:
+        value: A numpy array, or a nested structure of dicts, lists and scalars
+        seen: The ids of the arrays already counted, so shared arrays are counted once
+
+    Returns:
+        The estimated number of bytes, where memory-mapped arrays use none
+    """
+    if seen is None:
+        seen = set()
+    if isinstance(value, np.ndarray):
+        if id(value) in seen or isinstance(value, np.memmap):
+            return 0
+        seen.add(id(value))
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            _sizeof(key, seen) + _sizeof(item, seen) for key, item in value.items()
+        )
+    if isinstance(value, list | tuple):
+        return sys.getsizeof(value) + sum(_sizeof(item, seen) for item in value)
+    return sys.getsizeof(value)
+
+
+def memory_usage() -> dict[str, int]:
+    """Get the number of bytes used by each of the datasets held in the datahub.
+
+    Returns:
+        The bytes used by the Opal data, the DSR data and summaries, the WESIM data and
+        the cache of compressed responses, and their total
+    """
+    seen: set[int] = set()
+    usage = {
+        "opal": int(dt.opal_df.memory_usage(deep=True).sum()),
+        "dsr": sum(_sizeof(entry, seen) for entry in dt.dsr_data)
+        + sum(_sizeof(summary, seen) for summary in dt.dsr_summaries)
+        + sum(stack.nbytes for stack in dt.dsr_series.values()),
+        "wesim": _sizeof(dt.wesim_data),
+        "compressed_cache": compressed_cache.nbytes,
+    }
+    usage["total"] = sum(usage.values())
+
+    return usage
+
+
+def memory_limits() -> dict[str, int]:
+    """Get the soft and hard memory limits, where 0 is disabled.
+
+    Returns:
+        The limits in bytes
+    """
+    return {"soft": MEMORY_SOFT_LIMIT, "hard": MEMORY_HARD_LIMIT}
+
+
+def compact() -> None:
+    """Free the memory that can be recovered without losing any data."""
+    log.info("Compacting data...")
+    compressed_cache.clear()
+    dt.opal_df.opal.clear_cache()
+
+
+def check_memory(incoming: int = 0) -> None:
+    """Check there is enough memory to accept new data.
+
+    Past the soft limit the data is compacted. Past the hard limit the new data is
+    rejected. Each limit is disabled when set to 0.
+
+    Args:
+        incoming: The number of bytes of new data
+
+    Raises:
+        A HTTPException with a Retry-After header if the hard limit would be exceeded.
+    """
+    # Measuring the usage walks all the data, so skip it when there are no limits
+    if not MEMORY_SOFT_LIMIT and not MEMORY_HARD_LIMIT:
+        return
+
+    total = memory_usage()["total"] + incoming
+    if MEMORY_SOFT_LIMIT and total > MEMORY_SOFT_LIMIT:
+        log.warning(f"Memory usage of {total} bytes is over the soft limit")
+        compact()
+        total = memory_usage()["total"] + incoming
+
+    if MEMORY_HARD_LIMIT and total > MEMORY_HARD_LIMIT:
+        message = "Insufficient memory to store the data. Try again later."
+        log.error(message)
+        raise HTTPException(
+            status_code=507,
+            detail=message,
+            headers={"Retry-After": str(MEMORY_RETRY_AFTER)},
+        )
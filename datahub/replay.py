@@ -0,0 +1,135 @@
+"""Replay of captured ingest traffic against the Datahub API as a benchmark.
+
+The requests in a capture file, see `datahub.capture`, are sent with the same spacing
+as they were received, sped up by a given factor, then the throughput and latency of
+each endpoint are reported. The requests to each endpoint are sent in order, but
+concurrently with those to the other endpoints, so a slow DSR upload does not delay the
+Opal data. It needs the development dependencies and can run against a fresh app
+in-process or a running server:
+
+    python -m datahub.replay capture.log --speed 10
+    python -m datahub.replay capture.log --speed 100 --url http://localhost:8000
+"""
+
+import argparse
+import functools
+import time
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+import httpx
+
+from .capture import CapturedRequest, read_capture
+from .loadtest import LatencyRecorder, format_report
+
+# Requests that change how the following requests are handled, e.g. by resetting the
+# data, so they are sent on their own
+SIGNAL_PATHS = ("/set_model_signals", "/model_ready")
+
+
+def send_captured(client: httpx.Client, request: CapturedRequest) -> httpx.Response:
+    """Send a captured request.
+
+    Args:
+        client: The client for the Datahub API
+        request: The captured request
+
+    Returns:
+        The response
+    """
+    headers = {"Content-Type": request.content_type} if request.content_type else {}
+    return client.request(
+        request.method,
+        f"{request.path}?{request.query}" if request.query else request.path,
+        content=request.body,
+        headers=headers,
+    )
+
+
+def replay(
+    client: httpx.Client,
+    requests: Iterable[CapturedRequest],
+    speed: float = 1.0,
+) -> dict[str, dict[str, float]]:
+    """Replay captured requests with the same spacing, sped up by a factor.
+
+    Each endpoint has its own thread that sends its requests in order, so a request
+    is sent late if the previous request to the same endpoint is still waiting for its
+    response. The requests in `SIGNAL_PATHS` wait for all the requests before them to
+    finish and are finished before any request after them is sent.
+
+    Args:
+        client: The client for the Datahub API
+        requests: The captured requests, in the order they were received
+        speed: The factor to speed up the replay by, e.g. 10 for ten times faster
+
+    Raises:
+        ValueError if the speed is not positive.
+
+    Returns:
+        The results for each endpoint, as given by `LatencyRecorder.report`
+    """
+    if speed <= 0:
+        raise ValueError("Speed must be positive.")
+
+    recorder = LatencyRecorder()
+    endpoints: dict[str, ThreadPoolExecutor] = {}
+    sent: list[Future[None]] = []
+    first = None
+    start = time.perf_counter()
+    try:
+        for request in requests:
+            if first is None:
+                first = request.time
+            delay = (request.time - first) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+            name = f"{request.method} {request.path}"
+            send = functools.partial(send_captured, client, request)
+            if request.path in SIGNAL_PATHS:
+                wait(sent)
+                sent = []
+                recorder.request(name, send)
+            else:
+                if request.path not in endpoints:
+                    endpoints[request.path] = ThreadPoolExecutor(
+                        1, thread_name_prefix="replay"
+                    )
+                sent.append(
+                    endpoints[request.path].submit(recorder.request, name, send)
+                )
+    finally:
+        for executor in endpoints.values():
+            executor.shutdown()
+
+    return recorder.report(time.perf_counter() - start)
+
+
+def main() -> None:
+    """Replay a capture file from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", help="Path to the capture file")
+    parser.add_argument(
+        "--url", help="URL of a running server. Defaults to a fresh app in-process."
+    )
+    parser.add_argument("--speed", type=float, default=1.0, help="e.g. 1 to 100")
+    args = parser.parse_args()
+
+    requests = read_capture(args.capture)
+    if args.url:
+        with httpx.Client(base_url=args.url, timeout=None) as client:
+            results = replay(client, requests, args.speed)
+    else:
+        from fastapi.testclient import TestClient
+
+        from .main import app
+
+        with TestClient(app, raise_server_exceptions=False) as test_client:
+            results = replay(test_client, requests, args.speed)
+
+    print(format_report(results))
+
+
+if __name__ == "__main__":
+    main()
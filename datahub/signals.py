@@ -0,0 +1,70 @@
+"""This module defines the notification mechanism for the model control signals."""
+
+import asyncio
+import threading
+from collections.abc import Callable
+
+MAX_WAIT_TIMEOUT = 300.0
+
+
+class SignalNotifier:
+    """Wakes up coroutines that are waiting for the model signals to change.
+
+    The routes that set the signals run in a worker thread, while waiters may be
+    running in any event loop. Each waiter therefore registers an event bound to its
+    own loop and is woken with `call_soon_threadsafe`.
+    """
+
+    def __init__(self) -> None:
+        """Initialise the notifier with no waiters."""
+        self._lock = threading.Lock()
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    def notify(self) -> None:
+        """Wake up all the current waiters so they can re-check the signals."""
+        with self._lock:
+            waiters = list(self._waiters)
+
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The waiter's loop has already been closed
+                continue
+
+    async def wait_for(self, predicate: Callable[[], bool], timeout: float) -> bool:
+        """Wait until the predicate is true or the timeout has expired.
+
+        Args:
+            predicate: A function that checks the condition being waited for
+            timeout: The maximum time to wait, in seconds
+
+        Returns:
+            The value of the predicate when the wait finished
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while not predicate():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+
+            waiter = (loop, asyncio.Event())
+            with self._lock:
+                self._waiters.add(waiter)
+            try:
+                # Check again now the waiter is registered so no change is missed
+                if predicate():
+                    break
+                await asyncio.wait_for(waiter[1].wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+            finally:
+                with self._lock:
+                    self._waiters.discard(waiter)
+
+        return predicate()
+
+
+model_signals = SignalNotifier()
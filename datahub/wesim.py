@@ -1,9 +1,13 @@
 """This module defines the data structures for the WESIM model."""
 
 import os
+import threading
 
 import pandas as pd
 
+from . import data as dt
+from . import log
+
 REGIONS_KEY = {
     "Scotland": "SCO",
     "North Eng&Wal": "NEW",
@@ -14,6 +18,7 @@ REGIONS_KEY = {
 
 INTERCONNECTORS_KEY = {"SCO-IE", "NEW-NOR", "NEW-IE", "SEW-CE"}
 WESIM_DATA_FILE = os.environ.get("WESIM_DATA_FILE", "../1_Wesim_GB_hourly_data.xlsx")
+WESIM_POLL_INTERVAL = float(os.environ.get("WESIM_POLL_INTERVAL", "5"))
 
 
 def read_wesim(wesim_data_file: str) -> dict[int | str, pd.DataFrame]:
@@ -114,13 +119,16 @@ def structure_capacity(df: pd.DataFrame) -> pd.DataFrame:
     return df.reset_index().replace({"Code": REGIONS_KEY})
 
 
-def get_wesim() -> dict[str, dict]:  # type: ignore[type-arg]
+def get_wesim(wesim_data_file: str | None = None) -> dict[str, dict]:  # type: ignore[type-arg]
     """Gets the WESIM data from disk and puts it into pandas dataframes.
 
+    Args:
+        wesim_data_file: The path to the excel file. Defaults to `WESIM_DATA_FILE`.
+
     Returns:
         The WESIM data
     """
-    excel = read_wesim(WESIM_DATA_FILE)
+    excel = read_wesim(wesim_data_file or WESIM_DATA_FILE)
 
     capacity = structure_capacity(excel.pop("Capacity"))
     interconnectors = structure_wesim(excel.pop("Interconnector flows"))
@@ -137,3 +145,99 @@ def get_wesim() -> dict[str, dict]:  # type: ignore[type-arg]
         "Interconnector Capacity": interconnector_capacity.to_dict(orient="split"),
         "Interconnectors": interconnectors.to_dict(orient="split"),
     }
+
+
+class WesimWatcher:
+    """Reloads the WESIM data in the background when the excel file changes.
+
+    The file is polled for changes to its modification time and size. The data is
+    first loaded when it is requested, and is only reloaded once it has been loaded.
+    The new data is fully built before it replaces the old data, so requests never see
+    a partial result and only the first load has to be waited for.
+    """
+
+    def __init__(
+        self,
+        wesim_data_file: str | None = None,
+        interval: float = WESIM_POLL_INTERVAL,
+    ) -> None:
+        """Initialise the watcher for the excel file.
+
+        Args:
+            wesim_data_file: The path to the excel file. Defaults to `WESIM_DATA_FILE`.
+            interval: The number of seconds between checks for changes
+        """
+        self.wesim_data_file = wesim_data_file or WESIM_DATA_FILE
+        self.interval = interval
+        self._signature: tuple[int, int] | None = None
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _stat(self) -> tuple[int, int] | None:
+        """Get the modification time and size of the file, or None if it is missing."""
+        try:
+            stat = os.stat(self.wesim_data_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self) -> bool:
+        """Load the WESIM data if it has not been loaded or the file has changed.
+
+        The data is not replaced if the file changes while it is being read, as it may
+        have been read part way through being written.
+
+        Returns:
+            Whether new data was loaded
+        """
+        with self._load_lock:
+            signature = self._stat()
+            if dt.wesim_data and signature == self._signature:
+                return False
+
+            log.info("Loading Wesim data...")
+            data = get_wesim(self.wesim_data_file)
+            if self._stat() != signature:
+                log.warning("Wesim data file changed while loading. Retrying later.")
+                return False
+
+            with dt.wesim_lock:
+                dt.wesim_data = data
+                dt.wesim_generation += 1
+            self._signature = signature
+
+        return True
+
+    def start(self) -> None:
+        """Start loading the data and watching the file in a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="wesim", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching the file."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        """Reload the data whenever the file changes, until stopped."""
+        missing = False
+        while not self._stop.wait(self.interval):
+            if self._stat() is None:
+                if not missing:
+                    log.warning(f"Wesim data file {self.wesim_data_file} not found.")
+                    missing = True
+                continue
+            missing = False
+            if not dt.wesim_data:
+                continue
+            try:
+                self.load()
+            except Exception as err:
+                log.error(f"Failed to load Wesim data: {err}")
+
+
+wesim_watcher = WesimWatcher()
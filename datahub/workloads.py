@@ -0,0 +1,148 @@
+"""This module defines the thread pools that run each class of the API's workload."""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import ParamSpec, TypeVar
+
+from fastapi import HTTPException
+
+from . import log
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+INGEST_THREADS = int(os.environ.get("INGEST_THREADS", "4"))
+INGEST_QUEUE_LIMIT = int(os.environ.get("INGEST_QUEUE_LIMIT", "0"))
+CONTROL_THREADS = int(os.environ.get("CONTROL_THREADS", "2"))
+CONTROL_QUEUE_LIMIT = int(os.environ.get("CONTROL_QUEUE_LIMIT", "0"))
+QUERY_THREADS = int(os.environ.get("QUERY_THREADS", "8"))
+QUERY_QUEUE_LIMIT = int(os.environ.get("QUERY_QUEUE_LIMIT", "32"))
+QUEUE_RETRY_AFTER = int(os.environ.get("QUEUE_RETRY_AFTER", "1"))
+
+
+class Workload:
+    """A class of requests that run in their own bounded pool of threads.
+
+    Requests beyond the number of threads wait in a queue for a free thread, so a
+    burst of one class of requests cannot hold up the others. When the queue is full,
+    further requests are rejected with a 503 status code to be retried later.
+    """
+
+    def __init__(self, name: str, threads: int, queue_limit: int = 0) -> None:
+        """Initialise the workload and its pool of threads.
+
+        Args:
+            name: The name of the workload, used to name its threads
+            threads: The number of threads that run the requests
+            queue_limit: The number of requests that can wait for a thread, where 0 is
+                unlimited
+        """
+        self.name = name
+        self.threads = threads
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix=name)
+
+    async def run(self, func: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+        """Run a function in the workload's threads.
+
+        Args:
+            func: The function to run
+            *args: The positional arguments for the function
+            **kwargs: The keyword arguments for the function
+
+        Raises:
+            A HTTPException with a Retry-After header if the queue is full.
+
+        Returns:
+            The value returned by the function
+        """
+        with self._lock:
+            if self.queue_limit and self.pending >= self.threads + self.queue_limit:
+                message = f"Too many {self.name} requests. Try again later."
+                log.error(message)
+                raise HTTPException(
+                    status_code=503,
+                    detail=message,
+                    headers={"Retry-After": str(QUEUE_RETRY_AFTER)},
+                )
+            self.pending += 1
+
+        try:
+            context = contextvars.copy_context()
+            call = functools.partial(context.run, func, *args, **kwargs)
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, call
+            )
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    async def iterate(self, iterator: Iterator[T]) -> AsyncIterator[T]:
+        """Iterate over an iterator in the workload's threads, e.g. to stream a body.
+
+        The route that creates a streaming response returns before the body is sent, so
+        producing the body is counted as a pending request until the iterator is done.
+        It is not rejected when the queue is full, as its request was already accepted.
+
+        Args:
+            iterator: The iterator, which is closed when the iteration stops
+
+        Yields:
+            The items of the iterator
+        """
+        with self._lock:
+            self.pending += 1
+
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        try:
+            while True:
+                try:
+                    yield await loop.run_in_executor(
+                        self._executor, context.run, _next, iterator
+                    )
+                except _StopIteration:
+                    return
+        finally:
+            with self._lock:
+                self.pending -= 1
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def __call__(self, func: Callable[P, T]) -> Callable[P, Awaitable[T]]:
+        """Decorate a route so that it runs in the workload's threads.
+
+        The decorated route keeps the signature of the original, so FastAPI handles
+        its parameters in the same way.
+        """
+
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            return await self.run(func, *args, **kwargs)
+
+        return wrapper
+
+
+class _StopIteration(Exception):
+    """Raised in place of StopIteration, which cannot be raised out of a future."""
+
+
+def _next(iterator: Iterator[T]) -> T:
+    """Get the next item of an iterator, raising `_StopIteration` when done."""
+    try:
+        return next(iterator)
+    except StopIteration:
+        raise _StopIteration
+
+
+INGEST = Workload("ingest", INGEST_THREADS, INGEST_QUEUE_LIMIT)
+CONTROL = Workload("control", CONTROL_THREADS, CONTROL_QUEUE_LIMIT)
+QUERY = Workload("query", QUERY_THREADS, QUERY_QUEUE_LIMIT)
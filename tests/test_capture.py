@@ -0,0 +1,74 @@
+import itertools
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from datahub import data as dt
+from datahub.main import app
+
+
+@pytest.fixture(autouse=True)
+def reset_data():
+    """Pytest Fixture for resetting the data global variables."""
+    dt.reset_data()
+
+
+def test_capture_and_replay(tmp_path, opal_data, opal_data_array, dsr_data_path):
+    """Tests ingest requests are captured and can be replayed against the app."""
+    from datahub.capture import CaptureMiddleware, read_capture
+    from datahub.replay import replay
+
+    capture_path = tmp_path / "capture.log"
+    client = TestClient(CaptureMiddleware(app, capture_path))
+
+    opal_data_array[0] = 2
+    opal_data_array[5:5] = [0, 0, 0]
+    raw = np.array(opal_data_array, dtype="<f8").tobytes()
+    client.post("/model_ready?ready=true")
+    client.post("/opal", content=json.dumps(opal_data))
+    client.post(
+        "/opal/raw", content=raw, headers={"Content-Type": "application/octet-stream"}
+    )
+    client.post("/dsr", files={"file": dsr_data_path.read_bytes()})
+    client.get("/opal")
+    client.post("/set_model_signals?start=true")
+
+    # Checks only the requests that post data or set the signals are captured
+    requests = list(read_capture(capture_path))
+    assert [request.path for request in requests] == [
+        "/model_ready",
+        "/opal",
+        "/opal/raw",
+        "/dsr",
+        "/set_model_signals",
+    ]
+    assert requests[0].query == "ready=true"
+    assert json.loads(requests[1].body) == opal_data
+    assert requests[2].body == raw
+    assert requests[3].content_type.startswith("multipart/form-data")
+    assert dsr_data_path.read_bytes() in requests[3].body
+    assert all(a.time <= b.time for a, b in itertools.pairwise(requests))
+
+    # Checks a record cut short is ignored
+    with open(capture_path, "ab") as file:
+        file.write(b"\0" * 10)
+    assert len(list(read_capture(capture_path))) == 5
+
+    # Checks the replay recreates the data in a fresh app
+    dt.reset_data()
+    dt.model_running = False
+    with TestClient(app) as replay_client:
+        results = replay(replay_client, read_capture(capture_path), speed=100)
+
+    assert set(results) == {f"POST {request.path}" for request in requests}
+    assert all(result["errors"] == 0 for result in results.values())
+    assert dt.opal_df.index.tolist() == [1, 2]
+    assert len(dt.dsr_data) == 1
+    assert dt.model_running
+
+    with pytest.raises(ValueError):
+        replay(replay_client, [], speed=0)
+    with pytest.raises(ValueError):
+        list(read_capture(dsr_data_path))
@@ -0,0 +1,129 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from datahub import data as dt
+from datahub.client import DatahubClient
+from datahub.main import app
+
+client = DatahubClient(http_client=TestClient(app))
+
+
+@pytest.fixture(autouse=True)
+def reset_data():
+    """Pytest Fixture for resetting the data global variables."""
+    dt.reset_data()
+    dt.model_running = False
+    dt.model_resetting = False
+
+
+def test_opal_writer(opal_data, opal_data_array):
+    """Tests the writer posts frames in batches and the poller gets new frames."""
+    poller = client.opal_poller()
+    assert poller.poll().empty
+
+    with client.opal_writer(flush_interval=60, max_rows=3) as writer:
+        for frame in range(1, 6):
+            writer.write({**opal_data, "frame": frame, "time": frame * 10})
+        # Checks a full batch is posted without waiting for the interval
+        for _ in range(500):
+            if len(dt.opal_df.index):
+                break
+            time.sleep(0.01)
+        assert len(dt.opal_df.index) >= 3
+
+    assert dt.opal_df.index.tolist() == [1, 2, 3, 4, 5]
+    assert poller.poll().index.tolist() == [1, 2, 3, 4, 5]
+
+    # Checks only the frames received since the last poll are returned
+    opal_data_array[0] = 6
+    opal_data_array[5:5] = [0, 0, 0]
+    client.post_opal(opal_data_array)
+    new_frames = poller.poll()
+    assert new_frames.index.tolist() == [6]
+    assert new_frames["Total Generation"].iloc[0] == opal_data["total_gen"]
+    assert poller.poll().empty
+
+
+def test_opal_writer_retry(mocker, opal_data):
+    """Tests frames are kept and posted later if the datahub cannot be reached."""
+    post = mocker.patch.object(
+        client,
+        "post_opal_rows",
+        side_effect=[httpx.ConnectError("Unreachable"), None],
+    )
+    writer = client.opal_writer(flush_interval=60)
+    writer.write(opal_data)
+    with pytest.raises(httpx.ConnectError):
+        writer.flush()
+
+    writer.write({**opal_data, "frame": 2})
+    writer.close()
+    assert post.call_count == 2
+    assert post.call_args.args[0][:, 0].tolist() == [1, 2]
+
+
+def test_get_dsr(dsr_data_path):
+    """Tests DSR data is uploaded and decoded into arrays."""
+    client.upload_dsr(dsr_data_path)
+    client.upload_dsr(dsr_data_path.read_bytes())
+
+    entries = client.get_dsr(start=0)
+    assert len(entries) == 2
+    assert isinstance(entries[0]["EV State"], np.ndarray)
+    assert np.allclose(entries[0]["EV State"], dt.dsr_data[0]["EV State"])
+    assert entries[0]["Name"] == dt.dsr_data[0]["Name"]
+
+    entries = client.get_dsr(columns=["ev_state"], minute_end=9, ev_ids=[0, 2])
+    assert list(entries[0]) == ["EV State"]
+    assert entries[0]["EV State"].shape == (2, 10)
+
+    array = client.get_dsr_array("ev_state")
+    assert np.array_equal(array, dt.dsr_data[-1]["EV State"])
+
+    with pytest.raises(httpx.HTTPStatusError):
+        client.get_dsr(columns=["invalid"])
+
+
+def test_model_signals():
+    """Tests setting and getting the model signals."""
+    assert client.start_signal() is False
+
+    client.set_model_signals(True)
+    assert client.start_signal() is True
+    assert client.start_signal(wait_from=False, timeout=1) is True
+    assert client.stop_signal() is False
+
+    client.model_ready(False)
+    assert client.start_signal() is False
+    client.set_model_signals(False)
+    assert client.stop_signal() is True
+
+
+def test_import_leaves_logging(tmp_path):
+    """Tests importing the client does not configure the logging of the application."""
+    script = """
+import logging
+logger = logging.getLogger("app")
+import datahub.client
+print(logger.disabled, logging.getLogger("api_logger").handlers)
+"""
+    # Run in a fresh interpreter, in a directory without a log directory
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        check=True,
+        cwd=tmp_path,
+        env={"PYTHONPATH": str(Path(__file__).parents[1])},
+        text=True,
+    )
+
+    assert result.stdout.strip() == "False []"
+    assert result.stderr == ""
+    assert not (tmp_path / "log").exists()
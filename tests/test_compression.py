@@ -0,0 +1,186 @@
+import gzip
+
+import pytest
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+
+@pytest.mark.parametrize(
+    "accept_encoding,expected",
+    [
+        ("gzip, deflate", "gzip"),
+        ("gzip, zstd", "zstd"),
+        ("gzip;q=1.0, zstd;q=0.5", "gzip"),
+        ("*", "zstd"),
+        ("zstd;q=0, *;q=0.1", "gzip"),
+        ("deflate", None),
+        ("", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, expected):
+    """Tests the encoding is chosen from the Accept-Encoding header."""
+    from datahub.compression import negotiate_encoding
+
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_compress():
+    """Tests data is compressed with each encoding."""
+    from datahub.compression import compress
+
+    data = b"Gridlington " * 1000
+    assert gzip.decompress(compress(data, "gzip")) == data
+    assert zstandard.ZstdDecompressor().decompress(compress(data, "zstd")) == data
+
+    with pytest.raises(ValueError):
+        compress(data, "br")
+
+
+def test_compressed_cache():
+    """Tests compressed payloads are cached and evicted when over the size limit."""
+    from datahub.compression import CompressedCache
+
+    cache = CompressedCache(max_bytes=150, minimum_size=10)
+    calls = []
+
+    def render():
+        calls.append(1)
+        return bytes(range(100))
+
+    response = cache.response("a", "gzip", render)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.body) == bytes(range(100))
+
+    # Checks that the payload is only rendered and compressed once
+    cache.response("a", "gzip", render)
+    assert len(calls) == 1
+
+    # Checks that the least recently used payload is evicted
+    cache.response("b", "gzip", render)
+    assert cache.nbytes <= 150
+    cache.response("a", "gzip", render)
+    assert len(calls) == 3
+
+    # Checks that small payloads are not compressed
+    response = cache.response("c", "gzip", lambda: b"small")
+    assert "Content-Encoding" not in response.headers
+    assert response.body == b"small"
+
+
+def test_compressed_cache_threads():
+    """Tests the cache stays consistent when used from many threads at once."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from datahub.compression import CompressedCache
+
+    cache = CompressedCache(max_bytes=2000, minimum_size=10)
+
+    def request(key):
+        response = cache.response(key % 50, "gzip", lambda: bytes(range(100)) * 10)
+        assert gzip.decompress(response.body) == bytes(range(100)) * 10
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(request, range(2000)))
+
+    assert cache.nbytes == sum(len(body) for body in cache._cache.values())
+    assert cache.nbytes <= 2000
+
+
+def test_compression_middleware():
+    """Tests the middleware compresses large and streaming responses."""
+    from datahub.compression import CompressionMiddleware
+
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/small")
+    def small():
+        return "small"
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"a" * 100, b"b" * 100]))
+
+    client = TestClient(app)
+
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.json() == "small"
+
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.content == b"a" * 100 + b"b" * 100
+
+    response = client.get("/stream", headers={"Accept-Encoding": "zstd"})
+    assert response.headers["Content-Encoding"] == "zstd"
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+    assert decompressor.decompress(response.content) == b"a" * 100 + b"b" * 100
+
+
+def test_compression_middleware_pathsend():
+    """Tests the headers are sent before a file sent with the pathsend extension."""
+    import asyncio
+
+    from datahub.compression import CompressionMiddleware
+
+    async def app(scope, receive, send):
+        headers = [(b"content-type", b"text/plain")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.pathsend", "path": "/tmp/file"})
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(CompressionMiddleware(app)(scope, None, send))
+
+    assert [message["type"] for message in sent] == [
+        "http.response.start",
+        "http.response.pathsend",
+    ]
+    assert sent[0]["headers"] == [(b"content-type", b"text/plain")]
+
+
+def test_compression_middleware_thread(mocker):
+    """Tests large bodies and chunks are compressed in a worker thread."""
+    import anyio
+
+    from datahub.compression import COMPRESSION_THREAD_SIZE, CompressionMiddleware
+
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+    large = bytes(range(256)) * (COMPRESSION_THREAD_SIZE // 256)
+
+    @app.get("/large")
+    async def large_body():
+        return Response(large)
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([large, large]))
+
+    run_sync = mocker.spy(anyio.to_thread, "run_sync")
+    client = TestClient(app)
+
+    def compressed_in_thread():
+        # Unwrap the partial used to compress whole bodies
+        funcs = [
+            getattr(call.args[0], "func", call.args[0])
+            for call in run_sync.call_args_list
+        ]
+        return sum(func.__name__ == "compress" for func in funcs)
+
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.content == large
+    assert compressed_in_thread() == 1
+
+    response = client.get("/stream", headers={"Accept-Encoding": "zstd"})
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+    assert decompressor.decompress(response.content) == large * 2
+    assert compressed_in_thread() == 3
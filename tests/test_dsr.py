@@ -24,3 +24,174 @@ def test_validate_dsr_data(dsr_data):
     with pytest.raises(HTTPException) as err:
         validate_dsr_data(dsr_data)
     assert err.value.detail == "Missing required fields: Amount."
+
+
+def test_summarise_dsr_data(dsr_data):
+    """Tests the summarise_dsr_data function."""
+    from datahub.dsr import summarise_dsr_data
+
+    dsr_data["EV State"] = np.random.randint(3, size=(10, 1440)).astype("float32")
+    summary = summarise_dsr_data(dsr_data)
+
+    assert summary["Name"] == dsr_data["Name"]
+    assert summary["EVs"] == 10
+    assert summary["EV State Values"].tolist() == [0, 1, 2]
+    assert summary["EV State Counts"].shape == (3, 1440)
+    for value, counts in zip(summary["EV State Values"], summary["EV State Counts"]):
+        assert (counts == (dsr_data["EV State"] == value).sum(axis=0)).all()
+    assert np.allclose(summary["EV Battery Mean"], dsr_data["EV Battery"].mean(axis=0))
+
+    # Checks that fields with too many distinct values are not summarised
+    assert "EV Locations Counts" not in summary
+
+
+def test_deduplicate_dsr_data(dsr_data):
+    """Tests identical arrays in DSR entries are stored once and read-only."""
+    from datahub.dsr import ArrayPool, deduplicate_dsr_data
+
+    pool = ArrayPool()
+    first = deduplicate_dsr_data(dsr_data, pool)
+    copy = {
+        key: value if isinstance(value, str) else value.copy()
+        for key, value in dsr_data.items()
+    }
+    copy["Cost"] = copy["Cost"] + 1
+    second = deduplicate_dsr_data(copy, pool)
+
+    assert first["Name"] == second["Name"]
+    assert second["Amount"] is first["Amount"]
+    assert second["Cost"] is not first["Cost"]
+    assert np.array_equal(second["Cost"], copy["Cost"])
+    assert not first["Amount"].flags.writeable
+    arrays = [value for value in dsr_data.values() if not isinstance(value, str)]
+    assert len(pool) == len(arrays) + 1
+    assert pool.nbytes == sum(array.nbytes for array in arrays) + copy["Cost"].nbytes
+
+    # Arrays with the same bytes but a different shape are kept apart
+    reshaped = pool.intern(first["Amount"].reshape(-1))
+    assert reshaped is not first["Amount"]
+
+    pool.clear()
+    assert len(pool) == 0
+    assert pool.nbytes == 0
+
+
+def test_array_pool_storage(dsr_data, tmp_path):
+    """Tests arrays are stored in memory-mapped files when a directory is given."""
+    from datahub.dsr import ArrayPool
+
+    pool = ArrayPool(tmp_path)
+    array = pool.intern(dsr_data["EV State"])
+
+    assert isinstance(array, np.memmap)
+    assert np.array_equal(array, dsr_data["EV State"])
+    assert not array.flags.writeable
+    assert pool.nbytes == 0
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+    assert pool.intern(dsr_data["EV State"].copy()) is array
+
+    pool.clear()
+    assert list(tmp_path.glob("*.npy")) == []
+
+
+def test_series_stack():
+    """Tests the values of a field are stacked across entries."""
+    from datahub.dsr import SeriesStack
+
+    stack = SeriesStack()
+    assert stack.view().shape == (0,)
+
+    for i in range(5):
+        stack.append(np.full((1, 3), i, dtype="float32"))
+    assert stack.view().shape == (5, 1, 3)
+    assert stack.view()[:, 0, 0].tolist() == [0, 1, 2, 3, 4]
+    assert stack.view(-2).shape == (2, 1, 3)
+    assert not stack.view().flags.writeable
+    assert stack.nbytes == 8 * 3 * 4
+
+    # Checks that the stack is promoted to hold values of a wider type
+    stack.append(np.full((1, 3), 0.1))
+    assert stack.view().dtype == np.float64
+    assert stack.view()[-1, 0, 0] == 0.1
+
+
+def test_slice_dsr_array(dsr_data):
+    """Tests selecting minutes and EVs from the DSR arrays."""
+    from datahub.dsr import slice_dsr_array
+
+    battery = slice_dsr_array(
+        "EV Battery", dsr_data["EV Battery"], slice(60, 120), [1, 3]
+    )
+    assert battery.shape == (2, 60)
+    assert (battery == dsr_data["EV Battery"][[1, 3], 60:120]).all()
+    assert battery.flags.c_contiguous
+
+    # Checks that only the axes the field has are sliced
+    cost = slice_dsr_array("Cost", dsr_data["Cost"], slice(0, 10), [1])
+    assert cost.shape == (13, 10)
+    amount = slice_dsr_array("Amount", dsr_data["Amount"], slice(0, 10), [1])
+    assert amount is dsr_data["Amount"]
+
+
+def test_diff_dsr_entry(dsr_data):
+    """Tests finding the differences between DSR entries."""
+    from datahub.dsr import diff_dsr_entry
+
+    entry = {key: value for key, value in dsr_data.items() if key != "Warn"}
+    entry["Cost"] = entry["Cost"] + 1
+    entry["EV State"] = entry["EV State"].copy()
+    entry["EV State"][[2, 3, 7]] += 1
+    entry["EV Battery"] = entry["EV Battery"].copy()
+    entry["EV Mask"] = entry["EV Mask"][:5]
+
+    delta = diff_dsr_entry(entry, dsr_data)
+
+    assert delta.keys() == {"Warn", "Cost", "EV State", "EV Mask"}
+    assert delta["Warn"] is None
+    assert delta["Cost"] is entry["Cost"]
+    assert delta["EV Mask"] is entry["EV Mask"]
+    assert delta["EV State"]["ranges"].tolist() == [[2, 4], [7, 8]]
+    assert (delta["EV State"]["values"] == entry["EV State"][[2, 3, 7]]).all()
+
+    # Checks that NaNs in the same place are not differences
+    base = dict(dsr_data, **{"Actual EV": np.full((1, 1440), np.nan)})
+    entry = dict(dsr_data, **{"Actual EV": np.full((1, 1440), np.nan)})
+    assert diff_dsr_entry(entry, base) == {}
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"compression": "gzip", "shuffle": True, "chunks": (3, 100)},
+        {"compression": "gzip", "chunks": (4, 1440)},
+        {"compression": "lzf", "chunks": (3, 100)},
+        {"chunks": (3, 100)},
+    ],
+)
+def test_read_dsr_file_compressed(dsr_data, tmp_path, options):
+    """Tests reading DSR data from chunked and compressed datasets."""
+    import h5py  # type: ignore
+
+    from datahub.dsr import read_dsr_file
+
+    path = tmp_path / "compressed.h5"
+    with h5py.File(path, "w") as h5file:
+        for key, value in dsr_data.items():
+            if key == "EV Mask":
+                continue
+            if key in ["EV State", "EV Battery"]:
+                h5file.create_dataset(key, data=value, **options)
+            else:
+                h5file[key] = value
+        # Checks that chunks which were never written are filled in
+        h5file.create_dataset("EV Mask", shape=(10, 1440), fillvalue=1.0, **options)
+        h5file["EV Mask"][:2] = 0
+
+    with open(path, "rb") as file:
+        data = read_dsr_file(file)
+
+    assert (data["EV State"] == dsr_data["EV State"]).all()
+    assert (data["EV Battery"] == dsr_data["EV Battery"]).all()
+    assert data["EV Mask"][:2].sum() == 0
+    assert (data["EV Mask"][2:] == 1).all()
+    assert data["Name"] == dsr_data["Name"]
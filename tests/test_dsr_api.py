@@ -26,6 +26,12 @@ def test_post_dsr_api(dsr_data_path):
     # Checks that the DSR global variable has been updated
     assert len(dt.dsr_data) == 1
 
+    # Checks that the arrays of an identical upload are shared
+    with open(dsr_data_path, "rb") as dsr_data:
+        client.post("/dsr", files={"file": dsr_data})
+    assert len(dt.dsr_data) == 2
+    assert dt.dsr_data[1]["EV State"] is dt.dsr_data[0]["EV State"]
+
 
 def test_post_dsr_api_invalid(dsr_data_path):
     """Tests POSTing invalid DSR data to API."""
@@ -96,6 +102,11 @@ def test_get_dsr_api(dsr_data):
     assert response.json()["data"][0]["Name"] == dt.dsr_data[0]["Name"]
     assert response.json()["data"][1]["Name"] == dt.dsr_data[1]["Name"]
 
+    response = client.get("/dsr?start=0&end=0")
+    assert [entry["Name"] for entry in response.json()["data"]] == [
+        dt.dsr_data[0]["Name"]
+    ]
+
     # Checks column filtering
     response = client.get("/dsr?col=activities")
     assert len(response.json()["data"][0].keys()) == 1
@@ -112,3 +123,305 @@ def test_get_dsr_api(dsr_data):
     assert "Activities" in response.json()["data"][0].keys()
     assert len(response.json()["data"][1].keys()) == 1
     assert "Activities" in response.json()["data"][1].keys()
+
+
+def test_get_dsr_summary_api(dsr_data_path):
+    """Tests DSR summary GET method."""
+    with h5py.File(dsr_data_path, "r+") as dsr_data:
+        dsr_data.pop("EV State")
+        dsr_data["EV State"] = np.random.randint(3, size=(10, 1440))
+
+    with open(dsr_data_path, "rb") as dsr_data:
+        client.post("/dsr", files={"file": dsr_data})
+
+    response = client.get("/dsr/summary")
+    assert response.status_code == 200
+    summary = response.json()["data"][0]
+    assert summary["EVs"] == 10
+    assert np.array(summary["EV State Counts"]).sum(axis=0).tolist() == [10] * 1440
+    assert len(summary["EV Battery Mean"]) == 1440
+
+    # Checks that the end is included, including the first and last entries
+    with open(dsr_data_path, "rb") as dsr_data:
+        client.post("/dsr", files={"file": dsr_data})
+    assert len(client.get("/dsr/summary?start=0&end=0").json()["data"]) == 1
+    assert len(client.get("/dsr/summary?start=-2&end=-1").json()["data"]) == 2
+
+    # Checks that the summaries are reset with the data
+    dt.reset_data()
+    response = client.get("/dsr/summary")
+    assert response.json()["data"] == []
+
+
+def test_get_dsr_api_compressed(dsr_data):
+    """Tests DSR data GET method with compressed responses."""
+    from datahub.compression import compressed_cache
+
+    dt.dsr_data.append(dsr_data)
+
+    response = client.get("/dsr", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json()["data"][0]["Name"] == dsr_data["Name"]
+
+    # Checks that the compressed response is reused
+    cached_bytes = compressed_cache.nbytes
+    response = client.get("/dsr", headers={"Accept-Encoding": "gzip"})
+    assert compressed_cache.nbytes == cached_bytes
+    assert response.json()["data"][0]["Name"] == dsr_data["Name"]
+
+    # Checks that responses are uncompressed if the client does not accept it
+    response = client.get("/dsr", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert response.json()["data"][0]["Name"] == dsr_data["Name"]
+
+
+def test_get_dsr_api_stream(dsr_data):
+    """Tests DSR data GET method with a streamed response."""
+    dt.dsr_data.append(dsr_data)
+    new_data = dsr_data.copy()
+    new_data["Name"] = "A new entry"
+    dt.dsr_data.append(new_data)
+
+    response = client.get("/dsr?start=0&stream=true")
+    assert response.status_code == 200
+    assert response.json() == client.get("/dsr?start=0").json()
+
+    response = client.get("/dsr?start=0&col=name,kwh_cost&stream=true")
+    assert response.json()["data"][1].keys() == {"Name", "kWh Cost"}
+    assert response.json()["data"][1]["Name"] == "A new entry"
+    assert np.allclose(response.json()["data"][1]["kWh Cost"], dsr_data["kWh Cost"])
+
+    response = client.get("/dsr?start=5&stream=true")
+    assert response.json() == {"data": []}
+
+
+def test_get_dsr_api_stored(mocker, tmp_path, dsr_data):
+    """Tests DSR data GET method with the arrays memory mapped from storage."""
+    from datahub.dsr import ArrayPool, deduplicate_dsr_data
+
+    pool = ArrayPool(tmp_path)
+    mocker.patch.object(dt, "dsr_pool", pool)
+    dt.dsr_data.append(deduplicate_dsr_data(dsr_data, pool))
+    assert isinstance(dt.dsr_data[0]["EV State"], np.memmap)
+
+    response = client.get("/dsr")
+    assert response.status_code == 200
+    assert np.allclose(response.json()["data"][0]["EV State"], dsr_data["EV State"])
+
+    response = client.get("/dsr?stream=true")
+    assert response.status_code == 200
+    assert response.json() == client.get("/dsr").json()
+
+
+def test_post_dsr_api_memory_limit(mocker, dsr_data_path):
+    """Tests POSTing DSR data is rejected past the hard memory limit."""
+    mocker.patch("datahub.memory.MEMORY_HARD_LIMIT", 1)
+
+    with open(dsr_data_path, "rb") as dsr_data:
+        response = client.post("/dsr", files={"file": dsr_data})
+
+    assert response.status_code == 507
+    assert response.headers["Retry-After"] == "30"
+    assert len(dt.dsr_data) == 0
+
+    response = client.get("/memory")
+    assert response.json()["limits"] == {"soft": 0, "hard": 1}
+
+
+def test_post_dsr_api_memory_limit_decoded(mocker, tmp_path, dsr_data):
+    """Tests DSR data is rejected when it only exceeds the limit once decoded."""
+    from datahub.memory import memory_usage
+
+    compressed_path = tmp_path / "compressed.h5"
+    with h5py.File(compressed_path, "w") as h5file:
+        for key, value in dsr_data.items():
+            if isinstance(value, np.ndarray):
+                # Constant arrays compress to a small fraction of their size
+                h5file.create_dataset(
+                    key, data=np.zeros_like(value), compression="gzip"
+                )
+            else:
+                h5file[key] = value
+    size = compressed_path.stat().st_size
+    decoded = sum(v.nbytes for v in dsr_data.values() if isinstance(v, np.ndarray))
+    assert size < decoded
+    # Enough memory for the upload as sent, but not once it is decoded
+    limit = memory_usage()["total"] + (size + decoded) // 2
+    mocker.patch("datahub.memory.MEMORY_HARD_LIMIT", limit)
+
+    with open(compressed_path, "rb") as dsr_file:
+        response = client.post("/dsr", files={"file": dsr_file})
+    assert response.status_code == 507
+    with open(compressed_path, "rb") as dsr_file:
+        response = client.post("/dsr/batch", files={"files": dsr_file})
+    assert response.status_code == 507
+    assert len(dt.dsr_data) == 0
+    assert len(dt.dsr_pool) == 0
+
+
+@pytest.mark.parametrize("stored", [False, True])
+def test_get_dsr_array_api(mocker, tmp_path, dsr_data, stored):
+    """Tests getting a single DSR array in binary."""
+    import io
+
+    from datahub.dsr import ArrayPool, deduplicate_dsr_data
+
+    pool = ArrayPool(tmp_path if stored else None)
+    mocker.patch.object(dt, "dsr_pool", pool)
+    dt.dsr_data.append(deduplicate_dsr_data(dsr_data, pool))
+
+    response = client.get(
+        "/dsr/array?col=ev_state", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/octet-stream"
+    assert "Content-Encoding" not in response.headers
+    assert np.array_equal(np.load(io.BytesIO(response.content)), dsr_data["EV State"])
+
+    response = client.get("/dsr/array?col=activity_types&index=0")
+    array = np.load(io.BytesIO(response.content))
+    assert array.tolist() == dsr_data["Activity Types"].tolist()
+
+    response = client.get("/dsr/array?col=name")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "The specified column is not an array."
+
+    response = client.get("/dsr/array?col=ev_state&index=1")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Index is out of range."
+
+
+def test_get_dsr_series_api(dsr_data_path, dsr_data):
+    """Tests getting DSR fields stacked across the entries."""
+    response = client.get("/dsr/series?col=actual_ev")
+    assert response.status_code == 200
+    assert response.json() == {"data": {"Actual EV": []}}
+
+    for _ in range(3):
+        with open(dsr_data_path, "rb") as dsr_file:
+            client.post("/dsr", files={"file": dsr_file})
+
+    response = client.get("/dsr/series?col=actual_ev,cost&start=1")
+    series = response.json()["data"]
+    assert np.array(series["Actual EV"]).shape == (2, 1, 1440)
+    assert np.array(series["Cost"]).shape == (2, 13, 1440)
+    assert np.allclose(series["Cost"][1], dsr_data["Cost"])
+
+    # Checks that the end is included, including the first and last entries
+    response = client.get("/dsr/series?col=cost&start=0&end=0")
+    assert np.array(response.json()["data"]["Cost"]).shape == (1, 13, 1440)
+    response = client.get("/dsr/series?col=cost&start=-2&end=-1")
+    assert np.array(response.json()["data"]["Cost"]).shape == (2, 13, 1440)
+
+    response = client.get("/dsr/series?col=ev_state")
+    assert response.status_code == 400
+    assert response.json()["detail"] == (
+        "One or more of the specified columns are not series."
+    )
+
+
+def test_get_dsr_api_slice(dsr_data):
+    """Tests DSR data GET method selecting minutes and EVs."""
+    dt.dsr_data.append(dsr_data)
+
+    query = "col=ev_battery,actual_ev,amount&minute_start=60&minute_end=119&ev_ids=2,5"
+    response = client.get(f"/dsr?{query}")
+    assert response.status_code == 200
+    data = response.json()["data"][0]
+    assert np.allclose(data["EV Battery"], dsr_data["EV Battery"][[2, 5], 60:120])
+    assert np.array(data["Actual EV"]).shape == (1, 60)
+    assert np.array(data["Amount"]).shape == (1, 13)
+
+    # Checks that the stream and compressed responses are sliced the same way
+    assert client.get(f"/dsr?{query}&stream=true").json() == response.json()
+    compressed = client.get(f"/dsr?{query}", headers={"Accept-Encoding": "gzip"})
+    assert compressed.json() == response.json()
+    compressed = client.get("/dsr?col=actual_ev", headers={"Accept-Encoding": "gzip"})
+    assert np.array(compressed.json()["data"][0]["Actual EV"]).shape == (1, 1440)
+
+    response = client.get("/dsr?minute_start=10&minute_end=5")
+    assert response.status_code == 400
+    for query in ["minute_start=-1", "minute_end=1440", "minute_start=1440"]:
+        response = client.get(f"/dsr?{query}")
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Minutes must be between 0 and 1439."
+    response = client.get("/dsr?ev_ids=a")
+    assert response.json()["detail"] == "EV IDs must be comma-separated integers."
+    response = client.get("/dsr?ev_ids=10")
+    assert response.json()["detail"] == "One or more of the EV IDs are out of range."
+
+
+def test_get_dsr_api_base(dsr_data):
+    """Tests DSR data GET method with the differences from a base entry."""
+    dt.dsr_data.append(dsr_data)
+    new_data = dsr_data.copy()
+    new_data["Name"] = "A new entry"
+    new_data["EV State"] = dsr_data["EV State"].copy()
+    new_data["EV State"][4] += 1
+    dt.dsr_data.append(new_data)
+
+    response = client.get("/dsr?base=0")
+    assert response.status_code == 200
+    delta = response.json()["data"][0]
+    assert delta.keys() == {"Name", "EV State"}
+    assert delta["Name"] == "A new entry"
+    assert delta["EV State"]["ranges"] == [[4, 5]]
+    assert np.allclose(delta["EV State"]["values"], new_data["EV State"][4:5])
+
+    # Checks that the stream, compressed and sliced responses have the differences
+    assert client.get("/dsr?base=0&stream=true").json() == response.json()
+    compressed = client.get("/dsr?base=0", headers={"Accept-Encoding": "gzip"})
+    assert compressed.json() == response.json()
+    response = client.get("/dsr?base=0&ev_ids=0,1")
+    assert response.json()["data"][0] == {"Name": "A new entry"}
+    response = client.get("/dsr?base=-1")
+    assert response.json()["data"][0] == {}
+
+    # Checks that a field missing from the base entry is sent in full
+    del dt.dsr_data[0]["EV State"]
+    response = client.get("/dsr?base=0&col=ev_state")
+    assert response.status_code == 200
+    assert np.allclose(response.json()["data"][0]["EV State"], new_data["EV State"])
+
+    response = client.get("/dsr?base=2")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Base index is out of range."
+
+
+def test_post_dsr_batch_api(tmp_path, dsr_data_path, dsr_data):
+    """Tests POSTing many DSR entries at once to the API."""
+    grouped_path = tmp_path / "grouped.h5"
+    with h5py.File(grouped_path, "w") as h5file:
+        for name in ["10", "2"]:
+            group = h5file.create_group(name)
+            for key, value in dsr_data.items():
+                group[key] = value
+            group["Name"][...] = f"Entry {name}"
+
+    with open(dsr_data_path, "rb") as flat, open(grouped_path, "rb") as grouped:
+        response = client.post(
+            "/dsr/batch", files=[("files", flat), ("files", grouped)]
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {"filenames": ["data.h5", "grouped.h5"], "entries": 3}
+    assert [entry["Name"] for entry in dt.dsr_data] == [
+        dsr_data["Name"],
+        "Entry 2",
+        "Entry 10",
+    ]
+    assert len(dt.dsr_summaries) == 3
+    assert dt.dsr_data[1]["EV State"] is dt.dsr_data[0]["EV State"]
+
+    # Checks that no entries are appended if any are invalid
+    with h5py.File(grouped_path, "r+") as h5file:
+        h5file["10"].pop("Amount")
+
+    with open(dsr_data_path, "rb") as flat, open(grouped_path, "rb") as grouped:
+        response = client.post(
+            "/dsr/batch", files=[("files", flat), ("files", grouped)]
+        )
+
+    assert response.status_code == 422
+    assert response.json()["detail"] == ("grouped.h5: Missing required fields: Amount.")
+    assert len(dt.dsr_data) == 3
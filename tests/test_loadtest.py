@@ -0,0 +1,30 @@
+from fastapi.testclient import TestClient
+
+from datahub.main import app
+
+
+def test_run_load_test():
+    """Tests a short load test against the app in-process."""
+    from datahub.loadtest import format_report, run_load_test
+
+    with TestClient(app, raise_server_exceptions=False) as client:
+        results = run_load_test(
+            client,
+            duration=0.5,
+            opal_rate=20,
+            opal_raw=True,
+            dsr_uploads=1,
+            dsr_evs=10,
+            readers=2,
+            read_endpoints=["opal", "dsr"],
+        )
+
+    assert set(results) == {"GET /dsr", "GET /opal", "POST /dsr", "POST /opal/raw"}
+    for result in results.values():
+        assert result["requests"] > 0
+        assert result["errors"] == 0
+        assert result["p50"] <= result["p95"] <= result["p99"]
+
+    report = format_report(results)
+    assert len(report.splitlines()) == 5
+    assert "POST /opal/raw" in report
@@ -0,0 +1,70 @@
+import json
+import subprocess
+import sys
+
+# The time to import the app, on top of its dependencies, as a fraction of the time to
+# import the dependencies. Measured at about 0.15, so this catches a heavy import
+# without depending on the speed of the machine.
+IMPORT_TIME_BUDGET = 0.3
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import fastapi, numpy, pandas
+dependencies = time.perf_counter() - start
+start = time.perf_counter()
+import datahub.main
+duration = time.perf_counter() - start
+from datahub import data
+print(json.dumps({
+    "dependencies": dependencies,
+    "duration": duration,
+    "modules": [m for m in ("h5py", "openpyxl", "datahub.wesim") if m in sys.modules],
+    "opal_df": "opal_df" in vars(data),
+}))
+"""
+
+
+def test_import_time():
+    """Test importing the app is within budget and leaves the heavy parts lazy."""
+    # Run in a fresh interpreter so modules imported by other tests don't count
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    result = json.loads(output.splitlines()[-1])
+
+    assert result["duration"] < IMPORT_TIME_BUDGET * result["dependencies"]
+    assert result["modules"] == []
+    assert not result["opal_df"]
+
+
+def test_opal_frame_created_on_first_use():
+    """Test the Opal frame is created when first accessed and kept afterwards."""
+    from datahub import data as dt
+
+    dt.__dict__.pop("opal_df", None)
+    opal_df = dt.opal_df
+
+    assert opal_df.empty
+    assert dt.opal_df is opal_df
+
+
+def test_reset_data_waits_for_appends():
+    """Test the data is not reset while an append holds the lock of the data."""
+    import threading
+
+    from datahub import data as dt
+
+    for lock in (dt.opal_lock, dt.dsr_lock):
+        dt.dsr_data.append({"Name": "Entry"})
+        reset = threading.Thread(target=dt.reset_data)
+        with lock:
+            reset.start()
+            reset.join(0.1)
+            assert reset.is_alive()
+            assert dt.dsr_data
+        reset.join()
+        assert dt.dsr_data == []
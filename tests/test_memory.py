@@ -0,0 +1,60 @@
+import pytest
+
+from datahub import data as dt
+
+
+@pytest.fixture(autouse=True)
+def reset_data():
+    """Pytest Fixture for resetting the data global variables."""
+    dt.reset_data()
+
+
+def test_memory_usage(dsr_data, opal_data):
+    """Tests the memory used by each dataset is counted."""
+    from datahub.memory import memory_usage
+
+    usage = memory_usage()
+    assert usage["dsr"] == 0
+
+    dt.dsr_data.append(dsr_data)
+    dt.opal_df.opal.append(opal_data)
+    new_usage = memory_usage()
+
+    assert new_usage["dsr"] >= sum(
+        value.nbytes for value in dsr_data.values() if not isinstance(value, str)
+    )
+    assert new_usage["opal"] > usage["opal"]
+    assert new_usage["total"] == sum(
+        value for key, value in new_usage.items() if key != "total"
+    )
+
+    # Checks that arrays shared between entries are only counted once
+    dt.dsr_data.append(dict(dsr_data))
+    assert memory_usage()["dsr"] < 2 * new_usage["dsr"]
+
+
+def test_check_memory(mocker):
+    """Tests the memory limits compact the data and reject new data."""
+    from fastapi import HTTPException
+
+    from datahub import memory
+    from datahub.memory import check_memory
+
+    compact = mocker.patch("datahub.memory.compact")
+    usage = mocker.spy(memory, "memory_usage")
+
+    # Checks that nothing happens, not even measuring, when the limits are disabled
+    check_memory(10**12)
+    compact.assert_not_called()
+    usage.assert_not_called()
+
+    mocker.patch("datahub.memory.MEMORY_SOFT_LIMIT", 1)
+    check_memory()
+    compact.assert_called_once()
+
+    mocker.patch("datahub.memory.MEMORY_HARD_LIMIT", 10**9)
+    check_memory()
+    with pytest.raises(HTTPException) as err:
+        check_memory(10**9)
+    assert err.value.status_code == 507
+    assert err.value.headers == {"Retry-After": "30"}
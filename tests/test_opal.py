@@ -102,3 +102,362 @@ def test_append_opal_data_array(opal_data_array):
     data_1[1] = pd.Timestamp(OPAL_START_DATE) + pd.to_timedelta(data_1[1], unit="m")
 
     assert (df.loc[1] == data_1[1:]).all()
+
+
+def test_resample_opal_data(opal_data):
+    """Tests aggregating Opal data into time buckets using custom accessor."""
+    from datahub.opal import create_opal_frame
+
+    df = create_opal_frame()
+    for frame in range(1, 21):
+        data = opal_data.copy()
+        data["frame"] = frame
+        data["time"] = frame * 7
+        data["total_gen"] = frame
+        df.opal.append(data)
+
+        # Checks that the cached result matches a full recomputation
+        resampled = df.opal.resample_time("1h", "mean")
+        expected = df.drop(columns="Time").groupby(df["Time"].dt.floor("1h")).mean()
+        assert np.allclose(resampled.values, expected.values)
+
+    assert len(resampled.index) == 3
+    assert resampled["Total Generation"].iloc[0] == 4.5
+    assert df.opal.resample_time("1h", "max")["Total Generation"].tolist() == [
+        8,
+        17,
+        20,
+    ]
+    assert df.opal.resample_time("1h", "last")["Total Generation"].tolist() == [
+        8,
+        17,
+        20,
+    ]
+
+    # Checks that overwriting an earlier frame updates the cached buckets
+    data = opal_data.copy()
+    data["frame"] = 1
+    data["time"] = 7
+    data["total_gen"] = 100
+    df.opal.append(data)
+    assert df.opal.resample_time("1h", "max")["Total Generation"].tolist() == [
+        100,
+        17,
+        20,
+    ]
+
+    # Checks that errors are raised for invalid parameters
+    with pytest.raises(ValueError):
+        df.opal.resample_time("1h", "median")
+    with pytest.raises(ValueError):
+        df.opal.resample_time("1M", "mean")
+
+
+def test_resample_opal_data_overwritten_meanwhile(mocker, opal_data):
+    """Tests buckets computed while an earlier frame is overwritten are not cached."""
+    from datahub import opal
+    from datahub.opal import create_opal_frame
+
+    df = create_opal_frame()
+    for frame in range(1, 21):
+        df.opal.append(
+            {**opal_data, "frame": frame, "time": frame * 7, "total_gen": frame}
+        )
+    df.opal.resample_time("1h", "max")
+
+    # Overwrites the first frame while the newest buckets are being computed
+    widen = opal.widen_opal_frame
+    overwritten = []
+
+    def widen_and_overwrite(frame):
+        if not overwritten:
+            overwritten.append(True)
+            df.opal.append({**opal_data, "frame": 1, "time": 7, "total_gen": 100})
+        return widen(frame)
+
+    mocker.patch.object(opal, "widen_opal_frame", widen_and_overwrite)
+    df.opal.resample_time("1h", "max")
+    mocker.stopall()
+
+    df.opal.append({**opal_data, "frame": 21, "time": 147, "total_gen": 21})
+    assert df.opal.resample_time("1h", "max")["Total Generation"].tolist() == [
+        100,
+        17,
+        21,
+    ]
+
+
+def test_opal_stats(mocker, opal_data):
+    """Tests the running aggregates of Opal data using custom accessor."""
+    from datahub.opal import create_opal_frame
+
+    df = create_opal_frame()
+    assert df.opal.stats().loc["count"].eq(0).all()
+    assert df.opal.stats().loc["max"].isna().all()
+
+    for frame in range(1, 6):
+        data = opal_data.copy()
+        data["frame"] = frame
+        data["total_dem"] = frame * 10
+        df.opal.append(data)
+
+    # Checks that the running aggregates match those computed from the data
+    stats = df.opal.stats()
+    numeric = df.drop(columns="Time")
+    assert (stats.loc["count"] == 5).all()
+    assert np.allclose(stats.loc["sum"], numeric.sum())
+    assert np.allclose(stats.loc["mean"], numeric.mean())
+    assert np.allclose(stats.loc["min"], numeric.min())
+    assert np.allclose(stats.loc["max"], numeric.max())
+    assert np.allclose(stats.loc["last"], numeric.iloc[-1])
+    assert np.allclose(stats.loc["variance"], numeric.var(ddof=0))
+
+    # Checks that overwriting a frame replaces its values in the aggregates
+    data = opal_data.copy()
+    data["frame"] = 5
+    data["total_dem"] = 1
+    df.opal.append(data)
+    stats = df.opal.stats()
+    assert stats.at["count", "Total Demand"] == 5
+    assert stats.at["max", "Total Demand"] == 40
+    assert stats.at["sum", "Total Demand"] == 101
+    assert stats.at["last", "Total Demand"] == 1
+
+    # Checks that only the overwritten frame is read unless it held an extreme
+    frames = mocker.spy(df.opal, "_frames")
+    df.opal.append({**opal_data, "frame": 3, "total_dem": 35})
+    frames.assert_called_once_with(3, 3)
+    stats = df.opal.stats()
+    numeric = df.drop(columns="Time")
+    assert np.allclose(stats.loc["mean"], numeric.mean())
+    assert np.allclose(stats.loc["variance"], numeric.var(ddof=0))
+    assert np.allclose(stats.loc["min"], numeric.min())
+    assert np.allclose(stats.loc["max"], numeric.max())
+
+    # Checks that a batch of rows is combined with the aggregates at once
+    rows = np.random.rand(100, len(df.columns) + 1) * 100
+    rows[:, 0] = np.arange(6, 106)
+    df.opal.extend(rows)
+    stats = df.opal.stats()
+    numeric = df.drop(columns="Time")
+    assert (stats.loc["count"] == 105).all()
+    assert np.allclose(stats.loc["mean"], numeric.mean())
+    assert np.allclose(stats.loc["variance"], numeric.var(ddof=0))
+    assert np.allclose(stats.loc["min"], numeric.min())
+    assert np.allclose(stats.loc["last"], numeric.iloc[-1])
+
+
+def test_select_opal_data(opal_data):
+    """Tests selecting ranges of frames and times using custom accessor."""
+    from datahub.opal import create_opal_frame
+
+    df = create_opal_frame()
+    for frame in [3, 1, 5, 2, 4, 2]:
+        data = opal_data.copy()
+        data["frame"] = frame
+        data["time"] = frame * 10
+        df.opal.append(data)
+
+    # Checks that out-of-order and duplicate frames are kept in frame order
+    assert df.index.tolist() == [1, 2, 3, 4, 5]
+
+    assert df.opal.select().index.tolist() == [1, 2, 3, 4, 5]
+    assert df.opal.select(2, 4).index.tolist() == [2, 3, 4]
+    assert df.opal.select(start=4).index.tolist() == [4, 5]
+    assert df.opal.select(6).empty
+    assert df.opal.select(start_time=20, end_time=40).index.tolist() == [2, 3, 4]
+    assert df.opal.select(2, 3, start_time=25).index.tolist() == [3]
+
+    # Checks that time ranges are still selected when the times are not in order
+    data = opal_data.copy()
+    data["frame"] = 6
+    data["time"] = 15
+    df.opal.append(data)
+    assert df.opal.select(start_time=10, end_time=20).index.tolist() == [1, 2, 6]
+
+
+def test_extend_opal_data(opal_data_array):
+    """Tests appending many rows of Opal data at once using custom accessor."""
+    from datahub.opal import create_opal_frame, opal_headers
+
+    rows = np.array([opal_data_array] * 3, dtype=float)
+    rows[:, 0] = [3, 1, 2]
+    rows[:, 2] = [30, 10, 20]
+
+    df = create_opal_frame()
+    df.opal.extend(rows)
+
+    assert df.shape == (3, len(opal_headers))
+    assert df.index.tolist() == [1, 2, 3]
+    assert df["Total Generation"].tolist() == [10, 20, 30]
+    assert df.dtypes.equals(create_opal_frame().dtypes)
+
+    # Checks that duplicate frames overwrite existing rows
+    rows[:, 2] = [300, 100, 200]
+    df.opal.extend(rows[:1])
+    assert df["Total Generation"].tolist() == [10, 20, 300]
+
+    # Checks that invalid rows are rejected
+    with pytest.raises(ValueError):
+        df.opal.extend(rows[:, 1:])
+    rows[0, 0] = 1.5
+    with pytest.raises(ValueError):
+        df.opal.extend(rows)
+
+
+def test_decode_opal_array(opal_data_array):
+    """Tests decoding binary Opal data in the array format."""
+    from datahub.opal import decode_opal_array
+
+    opal_data_array[5:5] = [1, 2, 3]
+    rows = np.array([opal_data_array, opal_data_array], dtype="<f8")
+
+    decoded = decode_opal_array(rows.tobytes())
+    assert decoded.shape == (2, len(opal_data_array) - 3)
+    assert (decoded == np.delete(rows, slice(5, 8), axis=1)).all()
+
+    with pytest.raises(ValueError):
+        decode_opal_array(rows.tobytes()[:-8])
+
+
+def test_export_opal_data(opal_data):
+    """Tests exporting the Opal data in chunks using custom accessor."""
+    import io
+
+    from datahub.opal import create_opal_frame
+
+    df = create_opal_frame()
+    for frame in range(1, 6):
+        data = opal_data.copy()
+        data["frame"] = frame
+        df.opal.append(data)
+
+    chunks = list(df.opal.export("csv", start=2, chunk_rows=2))
+    assert len(chunks) == 3
+    exported = pd.read_csv(
+        io.BytesIO(b"".join(chunks)), index_col="frame", parse_dates=["Time"]
+    )
+    assert exported.index.tolist() == [2, 3, 4, 5]
+    assert exported.columns.tolist() == df.columns.tolist()
+    assert np.allclose(exported["Total Generation"], df["Total Generation"].iloc[1:])
+
+    chunks = df.opal.export("csv", columns=["Time"], end=0)
+    assert b"".join(chunks) == b"frame,Time\n"
+
+    with pytest.raises(ValueError):
+        df.opal.export("xlsx")
+    with pytest.raises(ValueError):
+        df.opal.export("csv", columns=["Invalid"])
+
+    pytest.importorskip("pyarrow")
+    chunks = list(df.opal.export("parquet", chunk_rows=2))
+    exported = pd.read_parquet(io.BytesIO(b"".join(chunks)))
+    assert exported.index.tolist() == [1, 2, 3, 4, 5]
+    pd.testing.assert_frame_equal(exported, df.rename_axis("frame"))
+
+
+def test_compact_opal_frame(opal_data):
+    """Tests the compact layout of Opal data matches the full layout when widened."""
+    from datahub.opal import create_opal_frame, widen_opal_frame
+
+    full = create_opal_frame("full")
+    compact = create_opal_frame("compact")
+    for frame in [3, 1, 2, 4]:
+        data = opal_data.copy()
+        data["frame"] = frame
+        data["time"] = frame * 25.5
+        data["total_gen"] = frame / 3
+        full.opal.append(data)
+        compact.opal.append(data)
+
+    # Checks the counts are held as small ints, the values and times as float32
+    assert compact["Total Generation"].dtype == np.float32
+    assert compact["Time"].dtype == np.float32
+    assert compact["Ev Status (Idle)"].dtype == np.int32
+    assert compact.index.dtype == np.int32
+    assert compact.memory_usage().sum() == full.memory_usage().sum() / 2
+
+    # Checks the selected data is widened to the full layout
+    selected = compact.opal.select(2, start_time=50)
+    assert selected.dtypes.equals(full.dtypes)
+    assert selected.index.tolist() == [2, 3, 4]
+    assert selected["Time"].equals(full.opal.select(2)["Time"])
+    assert np.allclose(selected["Total Generation"], [2 / 3, 1, 4 / 3], rtol=1e-7)
+    assert widen_opal_frame(full) is full
+
+    # Checks the resampled and exported data match the full layout
+    for _ in range(2):
+        assert np.allclose(
+            compact.opal.resample_time("1h", "mean"),
+            full.opal.resample_time("1h", "mean"),
+        )
+    assert b"".join(compact.opal.export("csv", ["Time"])) == b"".join(
+        full.opal.export("csv", ["Time"])
+    )
+
+    with pytest.raises(ValueError):
+        create_opal_frame("small")
+
+
+def test_opal_hot_window(opal_data, tmp_path):
+    """Tests frames beyond the hot window are spilled to disk and still selected."""
+    from datahub.opal import create_opal_frame
+
+    full = create_opal_frame()
+    df = create_opal_frame()
+    df.opal.hot_frames = 3
+    df.opal.storage_dir = tmp_path
+    for frame in range(1, 11):
+        data = opal_data.copy()
+        data["frame"] = frame
+        data["time"] = frame * 10
+        data["total_gen"] = frame
+        full.opal.append(data)
+        df.opal.append(data)
+
+    # Checks only the most recent frames are kept in memory
+    assert df.index.tolist() == [7, 8, 9, 10]
+    assert len(list(tmp_path.glob("opal-*/*"))) == 1
+
+    # Checks the spilled frames are selected along with the frames in memory
+    assert df.opal.select().equals(full.opal.select())
+    assert df.opal.select(2, 8).equals(full.opal.select(2, 8))
+    assert df.opal.select(start_time=35, end_time=85).index.tolist() == [4, 5, 6, 7, 8]
+    assert b"".join(df.opal.export("csv")) == b"".join(full.opal.export("csv"))
+
+    # Checks a spilled frame can be overwritten
+    data = opal_data.copy()
+    data["frame"] = 2
+    data["time"] = 20
+    data["total_gen"] = 100
+    full.opal.append(data)
+    df.opal.append(data)
+    assert df.opal.select(1, 3)["Total Generation"].tolist() == [1, 100, 3]
+    assert df.opal.stats().equals(full.opal.stats())
+    assert df.opal.resample_time("30min", "max").equals(
+        full.opal.resample_time("30min", "max")
+    )
+
+    # Checks the overwritten frame is appended to the same file when spilled again
+    data["frame"] = 11
+    data["time"] = 110
+    full.opal.append(data)
+    df.opal.append(data)
+    assert df.index.tolist() == [9, 10, 11]
+    assert len(list(tmp_path.glob("opal-*/*"))) == 1
+    assert df.opal.select().equals(full.opal.select())
+    assert df.opal.select(1, 3)["Total Generation"].tolist() == [1, 100, 3]
+
+    # Checks frames spilled while they are selected are still selected once
+    cold_select = df.opal._cold.select
+
+    def spill_and_select(*args):
+        df.opal._spill(1)
+        return cold_select(*args)
+
+    df.opal._cold.select = spill_and_select
+    assert df.opal.select().equals(full.opal.select())
+    assert df.index.tolist() == [10, 11]
+
+    df.opal.delete_spilled()
+    assert list(tmp_path.iterdir()) == []
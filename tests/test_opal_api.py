@@ -128,3 +128,191 @@ def test_opal_api_get_query(client, opal_data):
     assert response.json() == {
         "detail": "End parameter cannot be less than Start parameter."
     }
+
+
+def test_get_opal_resample_api(client, opal_data):
+    """Tests the Opal resample GET method."""
+    for frame in range(1, 5):
+        data = opal_data.copy()
+        data["frame"] = frame
+        data["time"] = frame * 10
+        data["total_gen"] = frame
+        client.post("/opal", data=json.dumps(data))
+
+    response = client.get("/opal/resample?every=30min&agg=max")
+    assert response.status_code == 200
+
+    resampled = pd.DataFrame(**response.json()["data"])
+    assert len(resampled.index) == 2
+    assert resampled["Total Generation"].tolist() == [2, 4]
+
+    # Checks that an error is raised when parameters are invalid.
+    response = client.get("/opal/resample?agg=median")
+    assert response.status_code == 400
+    assert response.json() == {
+        "detail": "Invalid aggregation. Expecting one of: mean, min, max, last."
+    }
+
+
+def test_get_opal_stats_api(client, opal_data):
+    """Tests the Opal stats GET method."""
+    response = client.get("/opal/stats")
+    assert response.status_code == 200
+    stats = pd.DataFrame(**response.json()["data"])
+    assert (stats.loc["count"] == 0).all()
+    assert stats.loc["max"].isna().all()
+
+    for frame in range(1, 4):
+        data = opal_data.copy()
+        data["frame"] = frame
+        data["total_dem"] = frame
+        client.post("/opal", data=json.dumps(data))
+
+    response = client.get("/opal/stats")
+    stats = pd.DataFrame(**response.json()["data"])
+    assert stats.at["count", "Total Demand"] == 3
+    assert stats.at["sum", "Total Demand"] == 6
+    assert stats.at["max", "Total Demand"] == 3
+
+
+def test_opal_api_get_time_query(client, opal_data):
+    """Tests the time query parameters for the Opal GET method."""
+    for frame in [4, 2, 3, 1]:
+        data = opal_data.copy()
+        data["frame"] = frame
+        data["time"] = frame * 10
+        client.post("/opal", data=json.dumps(data))
+
+    response = client.get("/opal")
+    assert response.json()["data"]["index"] == [1, 2, 3, 4]
+
+    response = client.get("/opal?start_time=15&end_time=30")
+    assert response.json()["data"]["index"] == [2, 3]
+
+    response = client.get("/opal?start=3&start_time=15")
+    assert response.json()["data"]["index"] == [3, 4]
+
+    # Checks that an error is raised when parameters are invalid.
+    response = client.get("/opal?start_time=30&end_time=15")
+    assert response.status_code == 400
+    assert response.json() == {
+        "detail": "End time parameter cannot be less than Start time parameter."
+    }
+
+
+def test_get_opal_api_hot_window(client, opal_data, tmp_path):
+    """Tests the Opal GET method serves frames spilled beyond the hot window."""
+    dt.opal_df.opal.hot_frames = 2
+    dt.opal_df.opal.storage_dir = tmp_path
+    for frame in range(1, 8):
+        data = opal_data.copy()
+        data["frame"] = frame
+        data["time"] = frame * 10
+        client.post("/opal", data=json.dumps(data))
+    assert len(dt.opal_df.index) < 4
+
+    response = client.get("/opal")
+    assert response.json()["data"]["index"] == list(range(1, 8))
+
+    response = client.get("/opal?start=2&end=5")
+    assert response.json()["data"]["index"] == [2, 3, 4, 5]
+
+    dt.reset_data()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_post_opal_api_compact_range(client, mocker, opal_data, opal_data_array):
+    """Tests Opal data beyond the range of the compact layout is rejected."""
+    import numpy as np
+
+    from datahub.opal import create_opal_frame
+
+    mocker.patch.object(dt, "opal_df", create_opal_frame("compact"))
+
+    for key, value in [("frame", 2**31), ("act_work", -(2**31) - 1)]:
+        response = client.post("/opal", data=json.dumps({**opal_data, key: value}))
+        assert response.status_code == 400
+
+    response = client.post("/opal", data=json.dumps({**opal_data, "total_gen": 1e39}))
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Total Generation values must be")
+
+    opal_data_array[5:5] = [1, 2, 3]
+    rows = np.array([opal_data_array] * 2, dtype="<f8")
+    rows[1, 0] = 2**31
+    response = client.post(
+        "/opal/raw",
+        content=rows.tobytes(),
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert response.status_code == 400
+    assert (
+        response.json()["detail"] == "Frames must be within -2147483648 to 2147483647."
+    )
+    assert dt.opal_df.empty
+
+    response = client.post("/opal", data=json.dumps(opal_data))
+    assert response.status_code == 200
+    assert dt.opal_df.index.tolist() == [1]
+
+
+def test_post_opal_api_raw(client, opal_data_array):
+    """Tests POSTing binary Opal data to API."""
+    import numpy as np
+
+    opal_data_array[5:5] = [1, 2, 3]
+    rows = np.array([opal_data_array] * 3, dtype="<f8")
+    rows[:, 0] = [1, 2, 3]
+
+    response = client.post(
+        "/opal/raw",
+        content=rows.tobytes(),
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"message": "Data submitted successfully."}
+    assert dt.opal_df.index.tolist() == [1, 2, 3]
+
+    # Checks that an error is raised when the length is invalid.
+    response = client.post(
+        "/opal/raw",
+        content=rows.tobytes()[:-8],
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert response.status_code == 400
+    assert response.json() == {
+        "detail": f"Binary data has invalid length. Expecting a multiple of "
+        f"{rows.shape[1] * 8} bytes."
+    }
+    assert len(dt.opal_df.index) == 3
+
+
+def test_export_opal_api(client, mocker, opal_data):
+    """Tests exporting the Opal data as a file."""
+    import io
+
+    for frame in range(1, 5):
+        data = opal_data.copy()
+        data["frame"] = frame
+        client.post("/opal", data=json.dumps(data))
+
+    response = client.get("/opal/export?col=time,total_gen&start=2")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/csv")
+    assert response.headers["Content-Disposition"] == 'attachment; filename="opal.csv"'
+    exported = pd.read_csv(io.BytesIO(response.content), index_col="frame")
+    assert exported.index.tolist() == [2, 3, 4]
+    assert exported.columns.tolist() == ["Time", "Total Generation"]
+
+    # Checks that an error is raised when parameters are invalid.
+    response = client.get("/opal/export?format=xlsx")
+    assert response.status_code == 400
+    assert response.json() == {
+        "detail": "Invalid format: xlsx. Must be one of csv, parquet."
+    }
+    response = client.get("/opal/export?col=invalid")
+    assert response.status_code == 400
+
+    mocker.patch("importlib.util.find_spec", return_value=None)
+    response = client.get("/opal/export?format=parquet")
+    assert response.status_code == 501
@@ -0,0 +1,27 @@
+import asyncio
+import threading
+
+
+def test_signal_notifier_wait_for():
+    """Tests waiting on the notifier for a change made in another thread."""
+    from datahub.signals import SignalNotifier
+
+    notifier = SignalNotifier()
+    state = {"running": False}
+
+    def change_state():
+        state["running"] = True
+        notifier.notify()
+
+    async def wait():
+        timer = threading.Timer(0.05, change_state)
+        timer.start()
+        result = await notifier.wait_for(lambda: state["running"], 5)
+        timer.join()
+        return result
+
+    assert asyncio.run(wait())
+
+    # Checks that the predicate is returned when the timeout expires
+    state["running"] = False
+    assert not asyncio.run(notifier.wait_for(lambda: state["running"], 0.01))
@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from datahub import data as dt
+from datahub.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def reset_model_signals():
+    """Pytest Fixture for resetting the model signal global variables."""
+    dt.model_running = False
+    dt.model_resetting = False
+
+
+def test_wait_start_signal_api():
+    """Tests the start wait method returns when the start signal is set."""
+    timer = threading.Timer(0.1, lambda: client.post("/set_model_signals?start=true"))
+    timer.start()
+    response = client.get("/start/wait?current=false&timeout=5")
+    timer.join()
+
+    assert response.status_code == 200
+    assert response.json() is True
+
+    # Checks that the current value is returned immediately if it has changed
+    response = client.get("/start/wait?current=false&timeout=5")
+    assert response.json() is True
+
+    # Checks that the current value is returned when the timeout expires
+    response = client.get("/start/wait?current=true&timeout=0.01")
+    assert response.json() is True
+
+
+def test_wait_stop_signal_api():
+    """Tests the stop wait method returns when the stop signal is set."""
+    dt.model_running = True
+
+    timer = threading.Timer(0.1, lambda: client.post("/set_model_signals?start=false"))
+    timer.start()
+    response = client.get("/stop/wait?current=false&timeout=5")
+    timer.join()
+
+    assert response.status_code == 200
+    assert response.json() is True
+
+    # Checks that an error is raised when the timeout is invalid
+    response = client.get("/stop/wait?timeout=-1")
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Timeout must be between 0 and 300 seconds."}
@@ -1,3 +1,5 @@
+import time
+
 import pandas as pd
 
 
@@ -73,3 +75,60 @@ def test_get_wesim(mocker, wesim_input_data):
     assert pd.DataFrame(**wesim["Regions"]).shape == (30, 10)
     assert pd.DataFrame(**wesim["Interconnector Capacity"]).shape == (4, 2)
     assert pd.DataFrame(**wesim["Interconnectors"]).shape == (25, 3)
+
+
+def test_wesim_watcher(mocker, tmp_path):
+    """Test the WESIM data is reloaded when the file changes."""
+    import os
+    import shutil
+
+    from datahub import data as dt
+    from datahub.wesim import WesimWatcher
+
+    mocker.patch.object(dt, "wesim_data", {})
+    path = tmp_path / "wesim.xlsx"
+    shutil.copy("tests/data/wesim_example.xlsx", path)
+    watcher = WesimWatcher(str(path), interval=0.01)
+
+    assert watcher.load()
+    data, generation = dt.wesim_data, dt.wesim_generation
+    assert pd.DataFrame(**data["Regions"]).shape == (30, 10)
+    assert not watcher.load()
+
+    # Checks that the data is replaced in the background when the file changes
+    watcher.start()
+    mtime = path.stat().st_mtime_ns + 10**9
+    os.utime(path, ns=(mtime, mtime))
+    for _ in range(500):
+        if dt.wesim_generation > generation:
+            break
+        time.sleep(0.01)
+    watcher.stop()
+
+    assert dt.wesim_generation == generation + 1
+    assert dt.wesim_data is not data
+    assert dt.wesim_data == data
+
+
+def test_wesim_watcher_lazy(mocker, caplog, tmp_path):
+    """Test the watcher waits for the data to be requested and the file to appear."""
+    import shutil
+
+    from datahub import data as dt
+    from datahub.wesim import WesimWatcher
+
+    mocker.patch.object(dt, "wesim_data", {})
+    load = mocker.patch.object(WesimWatcher, "load")
+    path = tmp_path / "wesim.xlsx"
+    watcher = WesimWatcher(str(path), interval=0.01)
+
+    # Checks that a missing file is only warned about once
+    watcher.start()
+    time.sleep(0.1)
+    assert caplog.text.count("not found") == 1
+
+    # Checks that the data is not loaded until it has been requested
+    shutil.copy("tests/data/wesim_example.xlsx", path)
+    time.sleep(0.1)
+    watcher.stop()
+    load.assert_not_called()
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from datahub import data as dt
+from datahub.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def reset_data():
+    """Pytest Fixture for resetting the data global variables."""
+    dt.reset_data()
+
+
+def test_workload_queue_limit():
+    """Tests requests run in the workload's threads and are shed when it is full."""
+    from fastapi import HTTPException
+
+    from datahub.workloads import Workload
+
+    workload = Workload("test", threads=1, queue_limit=1)
+    release = threading.Event()
+
+    async def run_all():
+        blocked = [
+            asyncio.create_task(workload.run(release.wait)),
+            asyncio.create_task(workload.run(release.wait)),
+        ]
+        await asyncio.sleep(0)
+        assert workload.pending == 2
+
+        with pytest.raises(HTTPException) as err:
+            await workload.run(threading.current_thread)
+        assert err.value.status_code == 503
+        assert err.value.headers == {"Retry-After": "1"}
+
+        release.set()
+        await asyncio.gather(*blocked)
+        return await workload.run(threading.current_thread)
+
+    thread = asyncio.run(run_all())
+    assert thread.name.startswith("test")
+    assert workload.pending == 0
+
+
+def test_workload_iterate():
+    """Tests iterators run in the workload's threads and count as pending until done."""
+    from datahub.workloads import Workload
+
+    workload = Workload("test", threads=1)
+    closed = []
+
+    def chunks():
+        try:
+            for _ in range(3):
+                assert workload.pending == 1
+                yield threading.current_thread().name
+        finally:
+            closed.append(True)
+
+    async def iterate_all():
+        return [chunk async for chunk in workload.iterate(chunks())]
+
+    async def iterate_first():
+        iterator = workload.iterate(chunks())
+        chunk = await anext(iterator)
+        await iterator.aclose()
+        return chunk
+
+    names = asyncio.run(iterate_all())
+    assert len(names) == 3
+    assert all(name.startswith("test") for name in names)
+    assert workload.pending == 0
+
+    # Checks the iterator is closed when the iteration stops early
+    assert asyncio.run(iterate_first()).startswith("test")
+    assert closed == [True, True]
+    assert workload.pending == 0
+
+
+def test_query_shedding_does_not_block_ingest(mocker, opal_data):
+    """Tests queries are shed when their queue is full while ingest carries on."""
+    from datahub.workloads import QUERY
+
+    mocker.patch.object(QUERY, "pending", QUERY.threads + QUERY.queue_limit)
+
+    response = client.get("/opal")
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Too many query requests. Try again later."
+
+    response = client.post("/opal", json=opal_data)
+    assert response.status_code == 200
+    assert len(dt.opal_df.index) == 1